@@ -3,23 +3,641 @@ from flask_cors import CORS
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 import cloudscraper
-import re
+import re, os, json, time, base64, socket, hashlib, secrets, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit, urljoin
+from email.utils import parsedate_to_datetime
 
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": ["http://localhost:5173", "http://localhost:5174", "https://quickwatch.co", "https://flix99.netlify.app", "http://192.168.1.8:5173"]}})
+ALLOWED_ORIGINS = ["http://localhost:5173", "http://localhost:5174", "https://quickwatch.co", "https://flix99.netlify.app", "http://192.168.1.8:5173"]
+CORS(app, resources={r"/*": {"origins": ALLOWED_ORIGINS}})
 
 session = requests.Session()
+# Only failed connects are retried here, statuses (429, 5xx) go straight to the per-host limiter and breaker below
 retry_strategy = Retry(
     total=3,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
-    backoff_factor=1
+    connect=3,
+    read=0,
+    status=0,
+    backoff_factor=0.5,
+    respect_retry_after_header=False
 )
 adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=20)
 session.mount("http://", adapter)
 session.mount("https://", adapter)
 
+TRACE_FILE = os.environ.get('PROXY_TRACE_FILE') # JSON lines of per-request timing spans, off when unset
+trace_local = threading.local()
+trace_lock = threading.Lock()
+
+class TimedConnectionMixin:
+    # Splits new connections into dns/connect/tls spans for the request being traced on this thread
+    def _new_conn(self):
+        spans = getattr(trace_local, 'spans', None)
+        if spans is None: return super()._new_conn()
+
+        started = time.perf_counter()
+        try: addresses = list(dict.fromkeys(info[4][0] for info in socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)))
+        except socket.gaierror: return super()._new_conn() # let urllib3 raise its usual resolution error
+        resolved = time.perf_counter()
+        spans['dns'] += resolved - started
+
+        dns_host = self._dns_host
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try: return super()._new_conn()
+                except Exception:
+                    if address == addresses[-1]: raise
+        finally:
+            self._dns_host = dns_host
+            spans['connect'] += time.perf_counter() - resolved
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection): pass
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        spans = getattr(trace_local, 'spans', None)
+        if spans is None: return super().connect()
+        started = time.perf_counter()
+        before = spans['dns'] + spans['connect']
+        super().connect()
+        spans['tls'] += time.perf_counter() - started - (spans['dns'] + spans['connect'] - before)
+
+class TimedHTTPConnectionPool(HTTPConnectionPool): ConnectionCls = TimedHTTPConnection
+class TimedHTTPSConnectionPool(HTTPSConnectionPool): ConnectionCls = TimedHTTPSConnection
+
+def trace_connections(http_adapter):
+    http_adapter.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+trace_connections(adapter)
+
+def write_trace(trace):
+    line = json.dumps(trace) + '\n'
+    with trace_lock:
+        with open(TRACE_FILE, 'a') as f: f.write(line)
+
+RATE_LIMIT_RPS = 10.0 # a host is unpaced until it answers 429 or Retry-After, then paced from this rate
+RATE_LIMIT_BURST = 20
+RATE_LIMIT_MIN_RPS = 0.5
+RATE_LIMIT_RECOVERY = 50 # successes in a row that take a paced host back to unpaced
+RATE_LIMIT_MAX_WAIT = 5 # longest a request queues for a token before failing fast
+BREAKER_WINDOW = 20 # recent outcomes the error rate is computed over
+BREAKER_MIN_REQUESTS = 10
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN = 30 # seconds open before a single probe is let through
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+HOST_STATES_MAX = 256
+
+class HostUnavailable(Exception): pass
+
+def retry_after_seconds(value):
+    if not value: return 0
+    try: return max(0, int(value))
+    except ValueError: pass
+    try: return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError): return 0
+
+class HostState:
+    # Token bucket that only exists once the host pushed back: the first 429 or Retry-After starts pacing at RATE_LIMIT_RPS,
+    # further 429s halve the rate, successes creep it back up and RATE_LIMIT_RECOVERY of them in a row end the pacing.
+    # Plus a circuit breaker that opens on a high error rate and half-opens with one probe after a cooldown.
+    def __init__(self, host):
+        self.host = host
+        self.lock = threading.Lock()
+        self.rate = None # unpaced
+        self.tokens = RATE_LIMIT_BURST
+        self.successes = 0
+        self.refilled_at = time.monotonic()
+        self.blocked_until = 0
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)
+        self.state = 'closed'
+        self.opened_at = 0
+        self.probing = False
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0
+        self.statuses = {}
+        self.bytes_in = 0
+        self.counters = {'requests': 0, 'errors': 0, 'throttled': 0, 'rejected': 0}
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.state == 'open':
+                if now - self.opened_at < BREAKER_COOLDOWN:
+                    self.counters['rejected'] += 1
+                    raise HostUnavailable(f'Circuit open for {self.host}')
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self.probing:
+                    self.counters['rejected'] += 1
+                    raise HostUnavailable(f'Circuit open for {self.host}')
+                self.probing = True
+
+            wait = max(self.blocked_until - now, 0)
+            if self.rate:
+                self.tokens = min(RATE_LIMIT_BURST, self.tokens + (now - self.refilled_at) * self.rate)
+                self.refilled_at = now
+                if self.tokens < 1: wait = max(wait, (1 - self.tokens) / self.rate)
+            if wait > RATE_LIMIT_MAX_WAIT:
+                self.counters['rejected'] += 1
+                if self.state == 'half_open': self.probing = False
+                raise HostUnavailable(f'Rate limited by {self.host}')
+            if self.rate: self.tokens -= 1 # reserve our token now, the sleep below covers any deficit
+            if wait > 0: self.counters['throttled'] += 1
+        if wait > 0: time.sleep(wait)
+
+    def record(self, status, elapsed, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+            failure = status is None or status == 429 or status >= 500
+            self.outcomes.append(failure)
+            self.counters['requests'] += 1
+            status_class = f'{status // 100}xx' if status else 'error'
+            self.statuses[status_class] = self.statuses.get(status_class, 0) + 1
+            if failure: self.counters['errors'] += 1
+            if status == 429 or (failure and retry_after):
+                if not self.rate: self.rate, self.tokens, self.refilled_at = RATE_LIMIT_RPS, 1, now
+                elif status == 429: self.rate = max(RATE_LIMIT_MIN_RPS, self.rate / 2)
+                self.successes = 0
+                self.blocked_until = max(self.blocked_until, now + retry_after_seconds(retry_after))
+            elif not failure and self.rate:
+                self.successes += 1
+                self.rate = None if self.successes >= RATE_LIMIT_RECOVERY else min(RATE_LIMIT_RPS, self.rate + RATE_LIMIT_RPS / 20)
+
+            self.latency[next((i for i, bound in enumerate(LATENCY_BUCKETS) if elapsed <= bound), len(LATENCY_BUCKETS))] += 1
+            self.latency_sum += elapsed
+
+            if self.state == 'half_open':
+                self.probing = False
+                self.state = 'open' if failure else 'closed'
+                if failure: self.opened_at = now
+                else: self.outcomes.clear()
+            elif len(self.outcomes) >= BREAKER_MIN_REQUESTS and sum(self.outcomes) / len(self.outcomes) >= BREAKER_ERROR_RATE:
+                self.state = 'open'
+                self.opened_at = now
+
+    def snapshot(self):
+        with self.lock:
+            count = sum(self.latency)
+            return {
+                'state': self.state,
+                'rate': round(self.rate, 3) if self.rate else None,
+                'tokens': round(self.tokens, 3) if self.rate else None,
+                'blocked_for': round(max(0, self.blocked_until - time.monotonic()), 3),
+                'error_rate': round(sum(self.outcomes) / len(self.outcomes), 3) if self.outcomes else 0,
+                **self.counters,
+                'statuses': dict(self.statuses),
+                'bytes_in': self.bytes_in,
+                'latency': {
+                    'buckets': dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], self.latency)),
+                    'count': count,
+                    'avg': round(self.latency_sum / count, 4) if count else 0
+                }
+            }
+
+host_states = OrderedDict()
+host_states_lock = threading.Lock()
+
+def host_key(url): return urlsplit(url).netloc.rpartition('@')[2].lower() # host[:port], a user:pass in the url stays out of /hosts and metric labels
+
+def host_state(url):
+    host = host_key(url)
+    with host_states_lock:
+        state = host_states.get(host)
+        if state is None:
+            state = host_states[host] = HostState(host)
+            if len(host_states) > HOST_STATES_MAX: host_states.popitem(last=False)
+        host_states.move_to_end(host)
+        return state
+
+SCRAPER_POOL_HOSTS = 64 # hosts kept before the least recently used one is evicted
+SCRAPER_POOL_PER_HOST = 4 # idle scrapers kept per host
+SCRAPER_IDLE_TIMEOUT = 600 # seconds before an idle scraper is dropped
+
+class ScraperPool:
+    # Long-lived CloudScraper sessions keyed by host so solved challenge cookies and connections get reused.
+    # Checkout/checkin only pop/append on a per-host deque (atomic), the lock just guards adding/evicting hosts.
+    def __init__(self, max_hosts=SCRAPER_POOL_HOSTS, per_host=SCRAPER_POOL_PER_HOST, idle_timeout=SCRAPER_IDLE_TIMEOUT):
+        self.max_hosts = max_hosts
+        self.per_host = per_host
+        self.idle_timeout = idle_timeout
+        self.hosts = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+    def checkout(self, url):
+        host = urlsplit(url).netloc
+        idle = self.hosts.get(host)
+        while idle:
+            try: scraper, last_used = idle.pop()
+            except IndexError: break # another thread took the last one
+            if time.monotonic() - last_used > self.idle_timeout:
+                self.counters['expired'] += 1
+                scraper.close()
+                continue
+            try: self.hosts.move_to_end(host)
+            except KeyError: pass # evicted meanwhile
+            self.counters['hits'] += 1
+            return scraper
+
+        self.counters['misses'] += 1
+        scraper = cloudscraper.CloudScraper()
+        for scraper_adapter in scraper.adapters.values(): trace_connections(scraper_adapter)
+        return scraper
+
+    def checkin(self, url, scraper):
+        host = urlsplit(url).netloc
+        idle = self.hosts.get(host)
+        if idle is None:
+            with self.lock:
+                idle = self.hosts.setdefault(host, deque())
+                while len(self.hosts) > self.max_hosts:
+                    _, evicted = self.hosts.popitem(last=False)
+                    for old, _ in evicted: old.close()
+                    self.counters['evictions'] += 1
+
+        if len(idle) >= self.per_host: scraper.close()
+        else: idle.append((scraper, time.monotonic()))
+
+    def stats(self):
+        return {**self.counters, 'hosts': len(self.hosts), 'idle': sum(len(idle) for idle in list(self.hosts.values()))}
+
+scraper_pool = ScraperPool()
+
+STREAM_CHUNK_SIZE = 64 * 1024
+FORWARD_RESPONSE_HEADERS = ['Content-Type', 'Content-Length', 'Content-Range', 'Accept-Ranges', 'Last-Modified', 'ETag']
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024 # in-memory tier size
+CACHE_MAX_ENTRY = 2 * 1024 * 1024 # bigger bodies are streamed and never cached
+CACHE_DIR = os.environ.get('PROXY_CACHE_DIR') # optional on-disk tier
+CACHE_DEFAULT_TTL = 120
+CACHE_STALE_TTL = 600 # how long past its ttl an entry is still served while it gets refreshed
+CACHE_TTLS = {'api.themoviedb.org': 3600, 'hianime.nz': 300, 'flixhq.to': 600, 'myflixerz.to': 600}
+CACHE_VARY_HEADERS = ['accept', 'accept-language', 'authorization', 'cookie', 'referer', 'x-requested-with']
+
+def cache_key(method, url, headers, form_data):
+    vary = sorted((key.lower(), value) for key, value in headers.items() if key.lower() in CACHE_VARY_HEADERS)
+    form_hash = hashlib.sha1(json.dumps(form_data, sort_keys=True).encode()).hexdigest()
+    return hashlib.sha1(json.dumps([method, url, vary, form_hash]).encode()).hexdigest()
+
+def has_range(headers): return any(name.lower() == 'range' for name in headers) # partial bodies never go in the cache
+
+def cache_ttl(url):
+    host = urlsplit(url).hostname or ''
+    return next((ttl for domain, ttl in CACHE_TTLS.items() if host == domain or host.endswith('.' + domain)), CACHE_DEFAULT_TTL)
+
+class ResponseCache:
+    # Size-bounded LRU of upstream responses with an optional disk tier behind it.
+    # Entries are dicts: stored_at, ttl, status, headers, body
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, directory=CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.refreshing = set()
+        self.counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'bytes_saved': 0, 'refreshes': 0}
+        if directory: os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry: self.entries.move_to_end(key)
+        if entry is None and self.directory:
+            entry = self.read_disk(key)
+            if entry: self.set(key, entry, disk=False)
+        if entry and time.time() - entry['stored_at'] > entry['ttl'] + CACHE_STALE_TTL: return None
+        return entry
+
+    def set(self, key, entry, disk=True):
+        with self.lock:
+            if key in self.entries: self.size -= len(self.entries.pop(key)['body'])
+            self.entries[key] = entry
+            self.size += len(entry['body'])
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted['body'])
+        if disk and self.directory: self.write_disk(key, entry)
+
+    def read_disk(self, key):
+        try:
+            with open(os.path.join(self.directory, key), 'rb') as f:
+                meta = json.loads(f.readline())
+                return {**meta, 'body': f.read()}
+        except (OSError, ValueError): return None
+
+    def write_disk(self, key, entry):
+        path = os.path.join(self.directory, key)
+        meta = {name: value for name, value in entry.items() if name != 'body'}
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(json.dumps(meta).encode() + b'\n')
+                f.write(entry['body'])
+            os.replace(path + '.tmp', path)
+        except OSError as e: print(f"Error writing cache entry: {str(e)}")
+
+    def stats(self):
+        lookups = self.counters['hits'] + self.counters['stale_hits'] + self.counters['misses']
+        hit_rate = (self.counters['hits'] + self.counters['stale_hits']) / lookups if lookups else 0
+        return {**self.counters, 'hit_rate': round(hit_rate, 4), 'entries': len(self.entries), 'bytes': self.size}
+
+response_cache = ResponseCache()
+
+def fetch_upstream(url, method, headers, form_data, timeout, use_cloudscraper):
+    state = host_state(url)
+    state.acquire()
+
+    # Choose session based on cf parameter, regular session for connection pooling
+    client = scraper_pool.checkout(url) if use_cloudscraper else session
+    if TRACE_FILE: trace_local.spans = {'dns': 0, 'connect': 0, 'tls': 0}
+    started = time.monotonic()
+    try:
+        if method == 'GET': response = client.get(url, headers=headers, timeout=timeout, stream=True)
+        else: response = client.post(url, data=form_data, headers=headers, timeout=timeout, stream=True)
+    except Exception:
+        state.record(None, time.monotonic() - started)
+        raise
+    finally: spans = trace_local.__dict__.pop('spans', None)
+    elapsed = time.monotonic() - started
+    state.record(response.status_code, elapsed, response.headers.get('Retry-After'))
+
+    # Count (and optionally time) the body wherever it ends up being read
+    iter_content = response.iter_content
+    def counted(chunk_size=1, decode_unicode=False):
+        received = 0
+        body_started = time.monotonic()
+        try:
+            for chunk in iter_content(chunk_size, decode_unicode):
+                received += len(chunk)
+                state.bytes_in += len(chunk)
+                yield chunk
+        finally:
+            if spans is not None:
+                connection = spans['dns'] + spans['connect'] + spans['tls']
+                write_trace({'time': time.time(), 'host': state.host, 'url': url, 'method': method, 'status': response.status_code, 'cf': use_cloudscraper,
+                             **{name: round(value, 6) for name, value in spans.items()}, 'ttfb': round(max(0, elapsed - connection), 6),
+                             'body': round(time.monotonic() - body_started, 6), 'bytes': received})
+    response.iter_content = counted
+
+    try: response.raise_for_status()
+    except requests.HTTPError: response.close(); raise
+
+    # Scrapers only go back to the pool once their response is done with
+    checkin = (lambda: scraper_pool.checkin(url, client)) if use_cloudscraper else None
+    return response, checkin
+
+FLIGHT_BUFFER_BYTES = 8 * 1024 * 1024 # how far a shared fetch may run ahead of its slowest reader
+FLIGHT_RETAIN_BYTES = 1024 * 1024 # bodies up to this size stay whole so late joiners still get everything
+FLIGHT_STALL_TIMEOUT = 2 # how long a full buffer may hold back readers that are keeping up before the laggards are dropped
+
+class ReaderDropped(Exception): pass
+
+class Flight:
+    # One upstream fetch shared by every identical request that arrives while it is in flight.
+    # A pump thread appends chunks, each reader walks them with its own cursor (a tee with bounded buffering).
+    # A reader more than the buffer behind one that is keeping up gets dropped and carries on with a ranged fetch of its own
+    def __init__(self):
+        self.args = None
+        self.cond = threading.Condition()
+        self.chunks = deque()
+        self.base = 0 # absolute index of chunks[0]
+        self.buffered = 0
+        self.readers = {}
+        self.next_reader = 0
+        self.response = None
+        self.error = None
+        self.done = False
+
+    def join(self):
+        with self.cond:
+            if self.base or self.done or self.error: return None # already dropped chunks, start a new fetch instead
+            reader = self.next_reader
+            self.next_reader += 1
+            self.readers[reader] = 0
+            return reader
+
+    def leave(self, reader):
+        with self.cond:
+            self.readers.pop(reader, None)
+            self.trim()
+            self.cond.notify_all()
+
+    def trim(self):
+        if self.buffered <= FLIGHT_RETAIN_BYTES: return
+        low = min(self.readers.values(), default=self.base + len(self.chunks))
+        while self.base < low:
+            self.buffered -= len(self.chunks.popleft())
+            self.base += 1
+
+    def drop_laggards(self):
+        # Only when someone has caught up with the pump, a buffer full because every reader is slow is plain back-pressure
+        head = self.base + len(self.chunks)
+        if head not in self.readers.values(): return
+        low = min(self.readers.values())
+        for reader in [reader for reader, position in self.readers.items() if position == low]:
+            del self.readers[reader]
+            flight_counters['dropped'] += 1
+        self.trim()
+        self.cond.notify_all()
+
+    def pump(self, key, args):
+        self.args = args
+        checkin = None
+        try:
+            response, checkin = fetch_upstream(*args)
+            with self.cond:
+                self.response = response
+                self.cond.notify_all()
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if not chunk: continue
+                with self.cond:
+                    while not self.cond.wait_for(lambda: self.buffered < FLIGHT_BUFFER_BYTES or not self.readers, FLIGHT_STALL_TIMEOUT): self.drop_laggards()
+                    if not self.readers: checkin = None; break # everyone left, stop pulling from upstream
+                    self.chunks.append(chunk)
+                    self.buffered += len(chunk)
+                    self.cond.notify_all()
+        except Exception as e:
+            checkin = None
+            with self.cond: self.error = e
+        finally:
+            with flights_lock:
+                if flights.get(key) is self: del flights[key]
+            if self.response is not None: self.response.close()
+            if checkin: checkin()
+            with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+    def read(self, reader):
+        sent = 0
+        try:
+            while True:
+                with self.cond:
+                    self.cond.wait_for(lambda: reader not in self.readers or self.readers[reader] < self.base + len(self.chunks) or self.done)
+                    if reader not in self.readers: break # dropped for lagging
+                    position = self.readers[reader]
+                    if position >= self.base + len(self.chunks):
+                        if self.error: raise self.error
+                        return
+                    chunk = self.chunks[position - self.base]
+                    self.readers[reader] = position + 1
+                    self.trim()
+                    self.cond.notify_all()
+                sent += len(chunk)
+                yield chunk
+        finally: self.leave(reader)
+        yield from self.resume(sent)
+
+    def resume(self, offset):
+        # The rest of the body for a dropped reader, from a Range fetch starting where it got to
+        url, method, headers, form_data, timeout, use_cloudscraper = self.args
+        upstream = self.response.headers
+        if self.response.status_code != 200 or upstream.get('Accept-Ranges') != 'bytes' or 'Content-Encoding' in upstream or has_range(headers):
+            raise ReaderDropped(f'Fell too far behind a shared fetch of {url}')
+        response, checkin = fetch_upstream(url, method, {**headers, 'Range': f'bytes={offset}-'}, form_data, timeout, use_cloudscraper)
+        try:
+            if response.status_code != 206 or not response.headers.get('Content-Range', '').startswith(f'bytes {offset}-'):
+                raise ReaderDropped(f'Could not resume {url} at byte {offset}')
+            flight_counters['resumed'] += 1
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if chunk: yield chunk
+        finally:
+            response.close()
+            if checkin: checkin()
+
+class FlightReader:
+    # Looks enough like a requests.Response for stream_response/read_response
+    def __init__(self, flight, reader):
+        self.flight = flight
+        self.reader = reader
+        self.status_code = flight.response.status_code
+        self.headers = flight.response.headers
+        self.url = flight.response.url
+        self.body = flight.read(reader)
+
+    def iter_content(self, chunk_size=None): return self.body
+
+    @property
+    def content(self): return b''.join(self.body)
+
+    def close(self):
+        self.body.close()
+        self.flight.leave(self.reader) # in case the body was never started
+
+flights = {}
+flights_lock = threading.Lock()
+flight_counters = {'fetches': 0, 'joined': 0, 'dropped': 0, 'resumed': 0}
+
+def fetch_coalesced(*args):
+    url, method, headers, form_data, timeout, use_cloudscraper = args
+    key = hashlib.sha1(json.dumps([method, url, sorted(headers.items()), form_data, use_cloudscraper], sort_keys=True).encode()).hexdigest()
+    with flights_lock:
+        flight = flights.get(key)
+        reader = flight.join() if flight else None
+        leader = reader is None
+        if leader:
+            flight = flights[key] = Flight()
+            reader = flight.join()
+    flight_counters['fetches' if leader else 'joined'] += 1
+    if leader: threading.Thread(target=flight.pump, args=(key, args), daemon=True).start()
+
+    with flight.cond: flight.cond.wait_for(lambda: flight.response is not None or flight.done)
+    if flight.response is None:
+        flight.leave(reader)
+        raise flight.error
+    return FlightReader(flight, reader), None
+
+def response_headers(response):
+    headers = {name: response.headers[name] for name in FORWARD_RESPONSE_HEADERS if name in response.headers}
+    if 'Content-Encoding' in response.headers: headers.pop('Content-Length', None) # body gets decoded on the way through
+    return headers
+
+def stream_response(response, on_close=None):
+    def generate():
+        try:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if chunk: yield chunk
+        finally:
+            response.close() # releases the pooled connection, also when the client disconnects mid-body
+            if on_close: on_close()
+
+    return Response(generate(), status=response.status_code, headers=response_headers(response), direct_passthrough=True)
+
+def read_response(response, checkin, key=None, content=None):
+    if content is None: content = response.content
+    if checkin: checkin()
+    entry = {'stored_at': time.time(), 'ttl': cache_ttl(response.url), 'status': response.status_code, 'headers': response_headers(response), 'body': content}
+    entry['headers'].pop('Content-Length', None)
+    cacheable = response.status_code == 200 and len(content) <= CACHE_MAX_ENTRY and 'no-store' not in response.headers.get('Cache-Control', '')
+    if key and cacheable: response_cache.set(key, entry)
+    return entry
+
+class ReadAhead:
+    # A response whose first chunks were already read, streams from those and then on from where the read stopped
+    def __init__(self, response, chunks, rest):
+        self.response = response
+        self.chunks = chunks
+        self.rest = rest
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+
+    def iter_content(self, chunk_size=None):
+        yield from self.chunks
+        yield from self.rest
+
+    @property
+    def content(self): return b''.join(self.iter_content())
+
+    def close(self): self.response.close()
+
+def read_capped(response, checkin, key=None, limit=CACHE_MAX_ENTRY):
+    # read_response for bodies up to limit. Chunked or unsized bodies only show their size on the way, so past the limit
+    # this stops reading and returns (None, response streaming on from what was read) instead, nothing gets cached
+    chunks = []
+    size = 0
+    rest = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+    for chunk in rest:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit: return None, ReadAhead(response, chunks, rest)
+    return read_response(response, checkin, key, b''.join(chunks)), None
+
+def refresh_cached(key, *args):
+    try:
+        response, checkin = fetch_upstream(*args)
+        read_response(response, checkin, key)
+        response_cache.counters['refreshes'] += 1
+    except Exception as e: print(f"Error refreshing cache entry: {str(e)}")
+    finally: response_cache.refreshing.discard(key)
+
+def lookup_cache(key, args):
+    entry = response_cache.get(key)
+    if not entry:
+        response_cache.counters['misses'] += 1
+        return None
+
+    response_cache.counters['bytes_saved'] += len(entry['body'])
+    if time.time() - entry['stored_at'] <= entry['ttl']:
+        response_cache.counters['hits'] += 1
+        return entry, 'HIT'
+
+    # Stale but usable: answer right away and refresh once in the background
+    response_cache.counters['stale_hits'] += 1
+    with response_cache.lock:
+        refresh = key not in response_cache.refreshing
+        response_cache.refreshing.add(key)
+    if refresh: threading.Thread(target=refresh_cached, args=(key, *args), daemon=True).start()
+    return entry, 'STALE'
+
+def cached_response(entry, state):
+    return Response(entry['body'], status=entry['status'], headers={**entry['headers'], 'X-Proxy-Cache': state})
+
 @app.route('/', methods=['POST'])
 def proxy():
     try:
@@ -28,41 +646,420 @@ def proxy():
         method = data.get('method', '').upper()
         headers = data.get('headers', {})
         use_cloudscraper = data.get('cf', False)
+        form_data = data.get('form_data', {})
+        stream = data.get('stream', True)
+        use_cache = data.get('cache', False)
         
         if not url: return jsonify({'error': 'URL is required'})
         if method not in ['GET', 'POST']: return jsonify({'error': 'Only GET and POST methods are allowed'})
 
         # Set default timeout
         timeout = data.get('timeout', 30)
+        if data.get('hls', False): return start_hls(url, headers, use_cloudscraper, timeout)
+
+        # Pass the client's Range through so seeking works on large bodies
+        if 'Range' in request.headers and not has_range(headers):
+            headers['Range'] = request.headers['Range']
         
-        # Choose session based on cf parameter
-        if use_cloudscraper:
-            scraper = cloudscraper.CloudScraper()
-            if method == 'GET': 
-                response = scraper.get(url, headers=headers, timeout=timeout, stream=True)
-                response.raise_for_status()
-                return response.content
-            else: 
-                form_data = data.get('form_data', {})
-                response = scraper.post(url, data=form_data, headers=headers, timeout=timeout, stream=True)
-                response.raise_for_status()
-                return response.content
-        else:
-            # Use regular session for connection pooling
-            if method == 'GET': 
-                response = session.get(url, headers=headers, timeout=timeout, stream=True)
-                response.raise_for_status()
-                return response.content
-            else: 
-                form_data = data.get('form_data', {})
-                response = session.post(url, data=form_data, headers=headers, timeout=timeout, stream=True)
-                response.raise_for_status()
-                return response.content
+        args = (url, method, headers, form_data, timeout, use_cloudscraper)
+        key = cache_key(method, url, headers, form_data) if use_cache and not has_range(headers) else None
+        cached = lookup_cache(key, args) if key else None
+        if cached: return cached_response(*cached)
+
+        # Identical GETs in flight at the same time share one upstream fetch
+        response, checkin = fetch_coalesced(*args) if method == 'GET' else fetch_upstream(*args)
+        too_big = int(response.headers.get('Content-Length') or 0) > CACHE_MAX_ENTRY
+        if key and not too_big:
+            entry, response = read_capped(response, checkin, key)
+            if entry: return cached_response(entry, 'MISS')
+        if not stream: return read_response(response, checkin)['body']
+        return stream_response(response, checkin)
             
+    except HostUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred.'}), 500
+
+BATCH_MAX_ITEMS = 50
+BATCH_CONCURRENCY = 6
+BATCH_MAX_CONCURRENCY = 16
+BATCH_ITEM_MAX = CACHE_MAX_ENTRY # bodies go back inside one JSON document, bigger ones have to use POST / instead
+
+def batch_item(index, data):
+    try:
+        url = data.get('url')
+        method = data.get('method', '').upper()
+        headers = data.get('headers', {})
+
+        if not url: return {'index': index, 'error': 'URL is required'}
+        if method not in ['GET', 'POST']: return {'index': index, 'error': 'Only GET and POST methods are allowed'}
+
+        args = (url, method, headers, data.get('form_data', {}), data.get('timeout', 30), data.get('cf', False))
+        key = cache_key(method, url, headers, args[3]) if data.get('cache', False) and not has_range(headers) else None
+        cached = lookup_cache(key, args) if key else None
+        if cached: entry, state = cached
+        else:
+            response, checkin = fetch_coalesced(*args) if method == 'GET' else fetch_upstream(*args)
+            entry, rest = read_capped(response, checkin, key, BATCH_ITEM_MAX)
+            if entry is None:
+                rest.close()
+                if checkin: checkin()
+                return {'index': index, 'status': 502, 'error': f'Response body is over {BATCH_ITEM_MAX} bytes'}
+            state = 'MISS' if key else None
+
+        item = {'index': index, 'status': entry['status'], 'headers': entry['headers']}
+        if state: item['cache'] = state
+        try: item['body'] = entry['body'].decode('utf-8')
+        except UnicodeDecodeError: item['body'], item['base64'] = base64.b64encode(entry['body']).decode(), True
+        return item
+
+    except HostUnavailable as e:
+        return {'index': index, 'status': 503, 'error': str(e)}
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        status = e.response.status_code if isinstance(e, requests.HTTPError) and e.response is not None else 500
+        return {'index': index, 'status': status, 'error': 'An unexpected error occurred.'}
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    # Takes a list of the same request objects POST / does (or {"requests": [...], "concurrency": n, "stream": bool})
+    # and runs them concurrently. "stream": true sends NDJSON lines in completion order, otherwise one JSON array in request order.
+    try:
+        data = request.get_json()
+        items = data if isinstance(data, list) else data.get('requests', [])
+        options = {} if isinstance(data, list) else data
+        concurrency = max(1, min(int(options.get('concurrency', BATCH_CONCURRENCY)), BATCH_MAX_CONCURRENCY))
+
+        if not items: return jsonify({'error': 'requests are required'})
+        if len(items) > BATCH_MAX_ITEMS: return jsonify({'error': f'At most {BATCH_MAX_ITEMS} requests per batch'})
+
+        executor = ThreadPoolExecutor(max_workers=min(concurrency, len(items)))
+        futures = [executor.submit(batch_item, index, item) for index, item in enumerate(items)]
+
+        if not options.get('stream', False):
+            try: return jsonify([future.result() for future in futures])
+            finally: executor.shutdown(wait=False)
+
+        def generate():
+            try:
+                for future in as_completed(futures): yield json.dumps(future.result()) + '\n'
+            finally: executor.shutdown(wait=False, cancel_futures=True) # client went away, skip what hasn't started
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred.'}), 500
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    with hls_sessions_lock: sessions = len(hls_sessions)
+    hls_stats = {'sessions': sessions, **hls_counters, 'cached_segments': len(segment_cache.entries), 'cached_bytes': segment_cache.size}
+    return jsonify({'scrapers': scraper_pool.stats(), 'cache': response_cache.stats(), 'coalescing': flight_counters, 'hls': hls_stats})
+
+@app.route('/hosts', methods=['GET'])
+def hosts():
+    with host_states_lock: states = list(host_states.values())
+    return jsonify({state.host: state.snapshot() for state in states})
+
+HLS_PREFETCH_SEGMENTS = 3 # segments read ahead of the one the player just asked for
+HLS_PREFETCH_WORKERS = 8
+HLS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+HLS_SEGMENT_MAX = 16 * 1024 * 1024 # bigger segments are only ever streamed through
+HLS_SEGMENT_TTL = 600
+HLS_WAIT_PREFETCH = 15 # how long a player request waits on a prefetch that is already downloading its segment
+HLS_SESSIONS_MAX = 256
+HLS_SESSION_IDLE = 30 * 60
+HLS_PUBLIC_URL = os.environ.get('PROXY_PUBLIC_URL') # base url players reach the proxy on, the request's own host when unset
+if HLS_PUBLIC_URL: HLS_PUBLIC_URL = HLS_PUBLIC_URL.rstrip('/') + '/'
+HLS_PLAYLIST_TYPE = 'application/vnd.apple.mpegurl'
+HLS_URI_ATTRIBUTE = re.compile(r'URI="([^"]*)"')
+HLS_URI_KINDS = {'#EXT-X-KEY': 'k', '#EXT-X-SESSION-KEY': 'k', '#EXT-X-MAP': 's', '#EXT-X-MEDIA': 'p', '#EXT-X-I-FRAME-STREAM-INF': 'p'}
+
+segment_cache = ResponseCache(max_bytes=HLS_CACHE_MAX_BYTES, directory=None)
+hls_executor = ThreadPoolExecutor(max_workers=HLS_PREFETCH_WORKERS)
+hls_counters = {'playlists': 0, 'prefetch_hits': 0, 'prefetch_waits': 0, 'misses': 0, 'prefetched': 0, 'skipped': 0, 'aborted': 0}
+
+def encode_uri(url): return base64.urlsafe_b64encode(url.encode()).decode().rstrip('=')
+def decode_uri(token): return base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+
+class HlsSession:
+    # One player's stream: the upstream headers every playlist, segment and key fetch needs, the segment order of each
+    # media playlist seen so far and where the player is in it. Read-ahead follows the player, after a seek whatever
+    # falls outside the new window is skipped if queued and cut off if downloading
+    def __init__(self, headers, use_cloudscraper, timeout):
+        self.id = secrets.token_urlsafe(9)
+        self.headers = headers
+        self.cf = use_cloudscraper
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.playlists = {} # media playlist url -> segment urls in order
+        self.positions = {} # segment url -> (playlist url, index)
+        self.cursors = {} # media playlist url -> index the player asked for last
+        self.queued = set() # segment urls handed to the executor that haven't started downloading
+        self.pending = {} # segment url -> Event set once its prefetch is done, only while it is downloading
+        self.used_at = time.monotonic()
+
+    def args(self, url, headers=None): return (url, 'GET', {**self.headers, **(headers or {})}, {}, self.timeout, self.cf)
+
+    def key(self, url): return cache_key('GET', url, self.headers, {})
+
+    def track(self, playlist, segments):
+        with self.lock:
+            for old in self.playlists.get(playlist, []): self.positions.pop(old, None)
+            self.playlists[playlist] = segments
+            for index, url in enumerate(segments): self.positions[url] = (playlist, index)
+
+    def wanted(self, url):
+        with self.lock:
+            playlist, index = self.positions.get(url, (None, None))
+            if playlist is None: return False
+            cursor = self.cursors.get(playlist, -1)
+            return cursor <= index <= cursor + HLS_PREFETCH_SEGMENTS
+
+    def advance(self, url):
+        with self.lock:
+            playlist, index = self.positions.get(url, (None, None))
+            if playlist is None: return
+            self.cursors[playlist] = index
+            upcoming = self.playlists[playlist][index + 1:index + 1 + HLS_PREFETCH_SEGMENTS]
+            start = [segment for segment in upcoming if segment not in self.queued and segment not in self.pending and segment_cache.get(self.key(segment)) is None]
+            self.queued.update(start)
+        for segment in start: hls_executor.submit(prefetch_segment, self, segment)
+
+    def begin(self, url):
+        # A queued prefetch only downloads if the player hasn't already asked for the segment itself
+        with self.lock:
+            if url not in self.queued: return None
+            self.queued.discard(url)
+            self.pending[url] = threading.Event()
+            return self.pending[url]
+
+    def claim(self, url):
+        # The player wants url now: a queued prefetch is dropped, a running one is returned to wait on
+        with self.lock:
+            self.queued.discard(url)
+            return self.pending.get(url)
+
+hls_sessions = OrderedDict()
+hls_sessions_lock = threading.Lock()
+
+def new_hls_session(headers, use_cloudscraper, timeout):
+    session = HlsSession(headers, use_cloudscraper, timeout)
+    with hls_sessions_lock:
+        hls_sessions[session.id] = session
+        while len(hls_sessions) > HLS_SESSIONS_MAX: hls_sessions.popitem(last=False)
+    return session
+
+def hls_session(session_id):
+    with hls_sessions_lock:
+        session = hls_sessions.get(session_id)
+        if session is None or time.monotonic() - session.used_at > HLS_SESSION_IDLE: return None
+        hls_sessions.move_to_end(session_id)
+        session.used_at = time.monotonic()
+        return session
+
+def rewrite_playlist(session, text, playlist_url, base_url, proxy_root):
+    # Every uri (variants, renditions, segments, init maps, keys) is made absolute and pointed back at /hls/<session>/<kind>/
+    def proxied(uri, kind): return f'{proxy_root}hls/{session.id}/{kind}/{encode_uri(urljoin(base_url, uri))}'
+    lines = []
+    segments = []
+    next_kind = 's'
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            tag = stripped.split(':', 1)[0]
+            if tag in HLS_URI_KINDS: line = HLS_URI_ATTRIBUTE.sub(lambda match: f'URI="{proxied(match.group(1), HLS_URI_KINDS[tag])}"', line)
+            if tag == '#EXT-X-STREAM-INF': next_kind = 'p'
+        elif stripped:
+            if next_kind == 's': segments.append(urljoin(base_url, stripped))
+            line = proxied(stripped, next_kind)
+            next_kind = 's'
+        lines.append(line)
+    if segments: session.track(playlist_url, segments)
+    return '\n'.join(lines) + '\n'
+
+def serve_playlist(session, url):
+    response, checkin = fetch_upstream(*session.args(url))
+    entry = read_response(response, checkin)
+    text = entry['body'].decode('utf-8', errors='replace')
+    if not text.lstrip().startswith('#EXTM3U'): return Response(entry['body'], status=entry['status'], headers=entry['headers'])
+    hls_counters['playlists'] += 1
+    body = rewrite_playlist(session, text, url, response.url, HLS_PUBLIC_URL or request.host_url)
+    return Response(body, status=entry['status'], headers={'Content-Type': HLS_PLAYLIST_TYPE, 'Cache-Control': 'no-cache'})
+
+def prefetch_segment(session, url):
+    if not session.wanted(url) or session.begin(url) is None:
+        with session.lock: session.queued.discard(url)
+        hls_counters['skipped'] += 1 # the player seeked away or fetched it itself before this got its turn
+        return
+    try:
+        response, checkin = fetch_upstream(*session.args(url))
+        chunks = []
+        size = 0
+        try:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                chunks.append(chunk)
+                if size > HLS_SEGMENT_MAX or not session.wanted(url):
+                    hls_counters['aborted'] += 1
+                    return
+        finally: response.close()
+        if checkin: checkin()
+        entry = {'stored_at': time.time(), 'ttl': HLS_SEGMENT_TTL, 'status': response.status_code, 'headers': response_headers(response), 'body': b''.join(chunks)}
+        entry['headers'].pop('Content-Length', None)
+        segment_cache.set(session.key(url), entry)
+        hls_counters['prefetched'] += 1
+    except Exception as e: print(f"Error prefetching segment: {str(e)}")
+    finally:
+        with session.lock: done = session.pending.pop(url, None)
+        if done: done.set()
+
+def serve_segment(session, url):
+    downloading = session.claim(url)
+    session.advance(url)
+    if downloading:
+        hls_counters['prefetch_waits'] += 1
+        downloading.wait(HLS_WAIT_PREFETCH)
+    entry = segment_cache.get(session.key(url))
+    if entry:
+        hls_counters['prefetch_hits'] += 1
+        return cached_response(entry, 'HIT')
+    hls_counters['misses'] += 1
+    response, checkin = fetch_coalesced(*session.args(url))
+    return stream_response(response, checkin)
+
+def start_hls(url, headers, use_cloudscraper, timeout):
+    if not url: return jsonify({'error': 'URL is required'})
+    return serve_playlist(new_hls_session(headers, use_cloudscraper, timeout), url)
+
+@app.route('/hls', methods=['GET'])
+def hls():
+    # HLS mode entry a player can load directly: /hls?url=<playlist>&headers=<json>&cf=1, same as POST / with "hls": true
+    try:
+        headers = json.loads(request.args.get('headers') or '{}')
+        return start_hls(request.args.get('url'), headers, request.args.get('cf') in ['1', 'true'], float(request.args.get('timeout', 30)))
+    except HostUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred.'}), 500
 
+@app.route('/hls/<session_id>/<kind>/<token>', methods=['GET'])
+def hls_uri(session_id, kind, token):
+    session = hls_session(session_id)
+    if session is None: return jsonify({'error': 'Unknown or expired HLS session'}), 404
+    try:
+        url = decode_uri(token)
+        if kind == 'p': return serve_playlist(session, url)
+        # Byte-range requests go straight through, read-ahead works on whole segments
+        if kind == 's' and 'Range' not in request.headers: return serve_segment(session, url)
+        response, checkin = fetch_coalesced(*session.args(url, {'Range': request.headers['Range']} if 'Range' in request.headers else None))
+        return stream_response(response, checkin)
+    except HostUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred.'}), 500
+
+UNMATCHED_ROUTE = 'unmatched'
+
+class CountBytesOut:
+    # WSGI wrapper counting what we send back to clients, streamed bodies included
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.counters = {'requests': {}, 'bytes_out': 0}
+
+    def route(self, environ):
+        # Label by the url rule that matched (/hls/<session_id>/<kind>/<token>), not the raw path, so labels stay bounded
+        try: return app.url_map.bind_to_environ(environ).match(return_rule=True)[0].rule
+        except Exception: return UNMATCHED_ROUTE
+
+    def __call__(self, environ, start_response):
+        route = self.route(environ)
+        self.counters['requests'][route] = self.counters['requests'].get(route, 0) + 1
+        body = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in body:
+                self.counters['bytes_out'] += len(chunk)
+                yield chunk
+        finally:
+            if hasattr(body, 'close'): body.close()
+
+app.wsgi_app = traffic = CountBytesOut(app.wsgi_app)
+
+def pool_stats(http_adapter):
+    pools = http_adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None or pool.pool is None: continue
+        yield f'{pool.scheme}://{pool.host}:{pool.port}', {'maxsize': pool.pool.maxsize, 'in_use': pool.pool.maxsize - pool.pool.qsize(), 'opened': pool.num_connections}
+
+def render_metrics():
+    lines = []
+    def sample(name, labels, value):
+        label_text = ','.join(f'{key}="{str(label).replace(chr(34), "")}"' for key, label in labels.items())
+        lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+    def metric(name, kind, description, samples):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples: sample(name, labels, value)
+
+    with host_states_lock: states = list(host_states.values())
+    metric('proxy_upstream_requests_total', 'counter', 'Upstream requests by host and status class',
+           [({'host': state.host, 'status': status_class}, count) for state in states for status_class, count in list(state.statuses.items())])
+    metric('proxy_upstream_rejected_total', 'counter', 'Requests failed fast by the rate limiter or circuit breaker', [({'host': state.host}, state.counters['rejected']) for state in states])
+    metric('proxy_upstream_circuit_open', 'gauge', '1 while the host circuit is open or half open', [({'host': state.host}, int(state.state != 'closed')) for state in states])
+    metric('proxy_upstream_bytes_in_total', 'counter', 'Body bytes received from upstream', [({'host': state.host}, state.bytes_in) for state in states])
+
+    lines.append('# HELP proxy_upstream_latency_seconds Time until upstream response headers')
+    lines.append('# TYPE proxy_upstream_latency_seconds histogram')
+    for state in states:
+        with state.lock: buckets, total = list(state.latency), state.latency_sum
+        cumulative = 0
+        for bound, bucket in zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], buckets):
+            cumulative += bucket
+            sample('proxy_upstream_latency_seconds_bucket', {'host': state.host, 'le': bound}, cumulative)
+        sample('proxy_upstream_latency_seconds_sum', {'host': state.host}, round(total, 6))
+        sample('proxy_upstream_latency_seconds_count', {'host': state.host}, cumulative)
+
+    metric('proxy_requests_total', 'counter', 'Requests served by route', [({'route': route}, count) for route, count in list(traffic.counters['requests'].items())])
+    metric('proxy_bytes_out_total', 'counter', 'Body bytes sent to clients', [({}, traffic.counters['bytes_out'])])
+
+    pools = list(pool_stats(adapter))
+    metric('proxy_pool_count', 'gauge', 'Connection pools held by the session adapter', [({}, len(pools))])
+    metric('proxy_pool_count_limit', 'gauge', 'Pools kept before the least recently used is dropped (pool_connections)', [({}, adapter._pool_connections)])
+    metric('proxy_pool_connections_in_use', 'gauge', 'Checked out connections per pool', [({'pool': name}, stats['in_use']) for name, stats in pools])
+    metric('proxy_pool_maxsize', 'gauge', 'Connection slots per pool (pool_maxsize)', [({'pool': name}, stats['maxsize']) for name, stats in pools])
+    metric('proxy_pool_connections_opened_total', 'counter', 'Connections opened per pool', [({'pool': name}, stats['opened']) for name, stats in pools])
+
+    scrapers = scraper_pool.stats()
+    metric('proxy_cloudscraper_checkouts_total', 'counter', 'Cloudscraper checkouts, misses mean a challenge gets solved again',
+           [({'result': 'hit'}, scrapers['hits']), ({'result': 'miss'}, scrapers['misses'])])
+    metric('proxy_cloudscraper_evictions_total', 'counter', 'Pooled scrapers dropped', [({'reason': 'lru'}, scrapers['evictions']), ({'reason': 'idle'}, scrapers['expired'])])
+    metric('proxy_cloudscraper_idle', 'gauge', 'Idle pooled scrapers', [({}, scrapers['idle'])])
+
+    cache = response_cache.stats()
+    metric('proxy_cache_lookups_total', 'counter', 'Response cache lookups', [({'result': 'hit'}, cache['hits']), ({'result': 'stale'}, cache['stale_hits']), ({'result': 'miss'}, cache['misses'])])
+    metric('proxy_cache_bytes_saved_total', 'counter', 'Body bytes answered from cache', [({}, cache['bytes_saved'])])
+    metric('proxy_cache_bytes', 'gauge', 'In-memory cache size', [({}, cache['bytes'])])
+    metric('proxy_coalesced_requests_total', 'counter', 'GETs that started or joined a shared upstream fetch',
+           [({'role': 'fetch'}, flight_counters['fetches']), ({'role': 'joined'}, flight_counters['joined'])])
+    metric('proxy_coalesced_dropped_total', 'counter', 'Readers dropped from a shared fetch for lagging, by whether a ranged fetch took over',
+           [({'outcome': 'resumed'}, flight_counters['resumed']), ({'outcome': 'failed'}, flight_counters['dropped'] - flight_counters['resumed'])])
+    metric('proxy_hls_segments_total', 'counter', 'HLS segments served, from read-ahead or fetched on demand',
+           [({'result': 'prefetched'}, hls_counters['prefetch_hits']), ({'result': 'miss'}, hls_counters['misses'])])
+    metric('proxy_hls_prefetch_total', 'counter', 'HLS read-ahead downloads by outcome',
+           [({'outcome': 'cached'}, hls_counters['prefetched']), ({'outcome': 'skipped'}, hls_counters['skipped']), ({'outcome': 'aborted'}, hls_counters['aborted'])])
+    metric('proxy_hls_cache_bytes', 'gauge', 'HLS read-ahead cache size', [({}, segment_cache.size)])
+    return '\n'.join(lines) + '\n'
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
     app.run(debug=False, port=5001, host='0.0.0.0', threaded=True)
\ No newline at end of file
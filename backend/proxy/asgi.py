@@ -0,0 +1,131 @@
+import asyncio, json
+import httpx
+
+from app import ALLOWED_ORIGINS, FORWARD_RESPONSE_HEADERS, STREAM_CHUNK_SIZE, host_key, scraper_pool
+
+# Async serving mode for the same POST / contract as app.py
+# Run with: uvicorn asgi:app --host 0.0.0.0 --port 5001 (or python asgi.py)
+# loadtest.py compares its req/s and latency against app.py on a local mock upstream
+
+MAX_CONNECTIONS = 1000
+MAX_KEEPALIVE = 200
+PER_HOST_LIMIT = 100
+RETRY_TOTAL = 3 # failed connects only, like app.py statuses (429, 5xx) are passed on as they are
+
+# One shared pool; HTTP/2 gets negotiated via ALPN where the upstream offers it, retries cover connect errors
+limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE)
+client = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(http2=True, retries=RETRY_TOTAL, limits=limits), follow_redirects=True)
+host_limits = {}
+
+def host_limit(url):
+    host = host_key(url)
+    if host not in host_limits: host_limits[host] = asyncio.Semaphore(PER_HOST_LIMIT)
+    return host_limits[host]
+
+def cloudscraper_fetch(url, method, headers, form_data, timeout):
+    # cloudscraper is blocking, so this runs in a worker thread and buffers the body
+    scraper = scraper_pool.checkout(url)
+    if method == 'GET': response = scraper.get(url, headers=headers, timeout=timeout)
+    else: response = scraper.post(url, data=form_data, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    scraper_pool.checkin(url, scraper)
+    return response
+
+async def open_upstream(url, method, headers, form_data, timeout):
+    request = client.build_request(method, url, headers=headers, data=form_data if method == 'POST' else None, timeout=timeout)
+    response = await client.send(request, stream=True)
+    if response.is_error: await response.aclose()
+    response.raise_for_status()
+    return response
+
+def forward_headers(upstream_headers):
+    headers = [(name.lower().encode(), upstream_headers[name].encode()) for name in FORWARD_RESPONSE_HEADERS if name in upstream_headers]
+    if 'Content-Encoding' in upstream_headers: headers = [h for h in headers if h[0] != b'content-length'] # body gets decoded on the way through
+    return headers
+
+async def send_json(send, body, status=200, cors=[]):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'application/json')] + cors})
+    await send({'type': 'http.response.body', 'body': json.dumps(body).encode()})
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'): return body
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect': pass
+
+async def proxy(scope, receive, send, cors):
+    try:
+        data = json.loads(await read_body(receive))
+        url = data.get('url')
+        method = data.get('method', '').upper()
+        headers = data.get('headers', {})
+        use_cloudscraper = data.get('cf', False)
+        form_data = data.get('form_data', {})
+
+        if not url: return await send_json(send, {'error': 'URL is required'}, cors=cors)
+        if method not in ['GET', 'POST']: return await send_json(send, {'error': 'Only GET and POST methods are allowed'}, cors=cors)
+
+        # Set default timeout
+        timeout = data.get('timeout', 30)
+
+        # Pass the client's Range through so seeking works on large bodies
+        request_headers = dict(scope['headers'])
+        if b'range' in request_headers and not any(key.lower() == 'range' for key in headers):
+            headers['Range'] = request_headers[b'range'].decode()
+
+        if use_cloudscraper:
+            response = await asyncio.to_thread(cloudscraper_fetch, url, method, headers, form_data, timeout)
+            response_headers = [h for h in forward_headers(response.headers) if h[0] != b'content-length']
+            await send({'type': 'http.response.start', 'status': response.status_code, 'headers': response_headers + cors})
+            return await send({'type': 'http.response.body', 'body': response.content})
+
+        async with host_limit(url):
+            response = await open_upstream(url, method, headers, form_data, timeout)
+            disconnected = asyncio.create_task(wait_disconnect(receive))
+            try:
+                await send({'type': 'http.response.start', 'status': response.status_code, 'headers': forward_headers(response.headers) + cors})
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    if disconnected.done(): break # client went away, stop pulling from upstream
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                disconnected.cancel()
+                await response.aclose()
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        try: await send_json(send, {'error': 'An unexpected error occurred.'}, 500, cors)
+        except Exception: pass # response was already started
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup': await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await client.aclose()
+            return await send({'type': 'lifespan.shutdown.complete'})
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan': return await lifespan(receive, send)
+    if scope['type'] != 'http': return
+
+    request_headers = dict(scope['headers'])
+    origin = request_headers.get(b'origin', b'').decode()
+    cors = [(b'access-control-allow-origin', origin.encode()), (b'vary', b'Origin')] if origin in ALLOWED_ORIGINS else []
+
+    if scope['method'] == 'OPTIONS':
+        cors += [(b'access-control-allow-methods', b'POST, OPTIONS'), (b'access-control-allow-headers', request_headers.get(b'access-control-request-headers', b'*'))]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': cors})
+        return await send({'type': 'http.response.body', 'body': b''})
+
+    if scope['path'] == '/' and scope['method'] == 'POST': return await proxy(scope, receive, send, cors)
+    if scope['path'] == '/stats' and scope['method'] == 'GET': return await send_json(send, {'scrapers': scraper_pool.stats()}, cors=cors)
+    await send_json(send, {'error': 'Not found'}, 404, cors)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5001)
@@ -0,0 +1,76 @@
+import argparse, sys, threading, time, http.server
+import requests
+from loadtest import FLASK_SERVER, free_port, start_server
+
+# Memory and time-to-first-byte of POST / for a large body, streamed ("stream": true, the default) against read whole
+# ("stream": false). The upstream runs in this process and makes up its body as it goes, the proxy runs in its own
+# process so its peak RSS (VmHWM, Linux) is only the proxy's.
+# Run with: python bench_streaming.py [--megabytes 300] [--runs 2]
+
+BLOCK = bytes(range(256)) * 4096 # 1 MiB
+
+class Upstream(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    size = 0
+
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(Upstream.size))
+        self.end_headers()
+        try:
+            for start in range(0, Upstream.size, len(BLOCK)): self.wfile.write(BLOCK[:min(len(BLOCK), Upstream.size - start)])
+        except (BrokenPipeError, ConnectionResetError): pass
+
+def peak_rss(pid):
+    with open(f'/proc/{pid}/status') as f:
+        return next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmHWM:'))
+
+def measure(proxy_url, upstream_url, stream):
+    started = time.perf_counter()
+    first_byte = None
+    received = 0
+    with requests.post(proxy_url, json={'url': upstream_url, 'method': 'GET', 'stream': stream}, stream=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=1024 * 1024):
+            if first_byte is None: first_byte = time.perf_counter() - started
+            received += len(chunk)
+    return first_byte, time.perf_counter() - started, received
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak RSS and TTFB of the proxy for streamed and buffered large bodies')
+    parser.add_argument('--megabytes', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=2)
+    args = parser.parse_args()
+
+    Upstream.size = args.megabytes * 1024 * 1024
+    upstream = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    upstream.daemon_threads = True
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    upstream_url = f'http://127.0.0.1:{upstream.server_address[1]}/body'
+
+    print(f'{args.megabytes} MiB body, {args.runs} run(s) per mode, fresh proxy process per mode')
+    print(f'{"mode":<10}{"ttfb ms":>10}{"total s":>10}{"MiB/s":>10}{"peak RSS +MiB":>15}')
+    for mode, stream in [('streamed', True), ('buffered', False)]:
+        port = free_port()
+        proxy = start_server([sys.executable, '-c', FLASK_SERVER.format(port=port)], port)
+        try:
+            baseline = peak_rss(proxy.pid)
+            runs = []
+            for run in range(args.runs):
+                # Unique url per run, so nothing is shared with an earlier fetch
+                first_byte, total, received = measure(f'http://127.0.0.1:{port}/', f'{upstream_url}?run={run}', stream)
+                if received != Upstream.size: raise RuntimeError(f'{mode}: got {received} of {Upstream.size} bytes')
+                runs.append((first_byte, total))
+            first_byte, total = min(runs, key=lambda run: run[1])
+            growth = (peak_rss(proxy.pid) - baseline) / 1024 / 1024
+            print(f'{mode:<10}{first_byte * 1000:>10.1f}{total:>10.2f}{args.megabytes / total:>10.1f}{growth:>15.1f}')
+        finally:
+            proxy.terminate()
+            proxy.wait()
+    upstream.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import argparse, asyncio, os, socket, subprocess, sys, time
+import httpx
+
+# Load test for the two ways of serving POST /: app.py (Flask, threaded) and asgi.py (uvicorn). Both proxy a local
+# mock upstream, so what's measured is the proxy and not the network. Needs uvicorn, like asgi.py itself.
+# Run with: python loadtest.py [--concurrency 50] [--duration 10] [--delay 0.02] [--bytes 16384]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+UPSTREAM_DELAY = float(os.environ.get('LOADTEST_DELAY', 0.02)) # seconds the mock upstream takes per response
+UPSTREAM_BYTES = int(os.environ.get('LOADTEST_BYTES', 16384))
+UPSTREAM_BODY = b'x' * UPSTREAM_BYTES
+WARMUP = 1.0
+STARTUP_TIMEOUT = 20
+FLASK_SERVER = "import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"
+
+async def upstream(scope, receive, send):
+    # The mock upstream, served by uvicorn in its own process: fixed delay, fixed body
+    if scope['type'] != 'http': return
+    await asyncio.sleep(UPSTREAM_DELAY)
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/octet-stream'), (b'content-length', str(UPSTREAM_BYTES).encode())]})
+    await send({'type': 'http.response.body', 'body': UPSTREAM_BODY})
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def uvicorn_command(target, port): return [sys.executable, '-m', 'uvicorn', target, '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', '--lifespan', 'on' if target == 'asgi:app' else 'off']
+
+def start_server(command, port, env=None):
+    process = subprocess.Popen(command, cwd=HERE, env={**os.environ, **(env or {})}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.monotonic()
+    while time.monotonic() - started < STARTUP_TIMEOUT:
+        if process.poll() is not None: raise RuntimeError(f'{" ".join(command)} exited with {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2): return process
+        except OSError: time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{" ".join(command)} did not start listening on {port}')
+
+def percentile(latencies, share): return latencies[min(len(latencies) - 1, int(len(latencies) * share))] if latencies else 0
+
+async def run_load(proxy_url, upstream_url, concurrency, duration, size):
+    # concurrency clients, each sending its next request as soon as the last one is read, for WARMUP + duration seconds.
+    # Every request asks for its own url: app.py would otherwise coalesce identical GETs into one upstream fetch
+    latencies = []
+    sent = 0
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        measure_from = time.perf_counter() + WARMUP
+        stop_at = measure_from + duration
+
+        async def worker():
+            nonlocal errors, sent
+            while time.perf_counter() < stop_at:
+                sent += 1
+                payload = {'url': f'{upstream_url}?n={sent}', 'method': 'GET'}
+                started = time.perf_counter()
+                try:
+                    response = await client.post(proxy_url, json=payload)
+                    ok = response.status_code == 200 and len(response.content) == size
+                except httpx.HTTPError: ok = False
+                if started < measure_from: continue
+                if ok: latencies.append(time.perf_counter() - started)
+                else: errors += 1
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    latencies.sort()
+    return {'requests': len(latencies), 'rps': len(latencies) / duration, 'p50': percentile(latencies, 0.5) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000, 'errors': errors}
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare req/s and latency of the Flask and ASGI proxy paths')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--delay', type=float, default=UPSTREAM_DELAY, help='mock upstream response delay in seconds')
+    parser.add_argument('--bytes', type=int, default=UPSTREAM_BYTES, help='mock upstream body size')
+    parser.add_argument('--paths', nargs='+', default=['flask', 'asgi'], choices=['flask', 'asgi'])
+    args = parser.parse_args()
+
+    upstream_port = free_port()
+    upstream_env = {'LOADTEST_DELAY': str(args.delay), 'LOADTEST_BYTES': str(args.bytes)}
+    processes = [start_server(uvicorn_command('loadtest:upstream', upstream_port), upstream_port, upstream_env)]
+    try:
+        results = {}
+        for path in args.paths:
+            port = free_port()
+            command = [sys.executable, '-c', FLASK_SERVER.format(port=port)] if path == 'flask' else uvicorn_command('asgi:app', port)
+            server = start_server(command, port)
+            processes.append(server)
+            try: results[path] = asyncio.run(run_load(f'http://127.0.0.1:{port}/', f'http://127.0.0.1:{upstream_port}/', args.concurrency, args.duration, args.bytes))
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        for process in processes:
+            if process.poll() is None: process.terminate()
+
+    print(f'{args.concurrency} clients for {args.duration:g}s, upstream {args.delay * 1000:g} ms / {args.bytes} bytes')
+    print(f'{"path":<8}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"requests":>10}{"errors":>8}')
+    for path, result in results.items():
+        print(f'{path:<8}{result["rps"]:>10.1f}{result["p50"]:>10.1f}{result["p99"]:>10.1f}{result["requests"]:>10}{result["errors"]:>8}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import os, sys, threading, http.server
+from collections import Counter
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import app as proxy
+
+SMALL = b'small body ' * 100
+LARGE = b'0123456789abcdef' * (proxy.CACHE_MAX_ENTRY // 16 + 4096) # past CACHE_MAX_ENTRY by 64 KiB
+
+class Upstream(http.server.BaseHTTPRequestHandler):
+    # /sized/* sends a Content-Length, /chunked/* doesn't, so its size only shows while reading
+    protocol_version = 'HTTP/1.1'
+    hits = Counter()
+
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        Upstream.hits[self.path] += 1
+        body = LARGE if self.path.endswith('/large') else SMALL
+        if self.headers.get('Range'):
+            start, end = (int(bound) for bound in self.headers['Range'][6:].split('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+            body = body[start:end + 1]
+        else: self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        if self.path.startswith('/sized/'):
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for start in range(0, len(body), 65536):
+            chunk = body[start:start + 65536]
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        self.wfile.write(b'0\r\n\r\n')
+
+@pytest.fixture(scope='module')
+def upstream():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+@pytest.fixture
+def client(upstream, monkeypatch):
+    Upstream.hits.clear()
+    monkeypatch.setattr(proxy, 'response_cache', proxy.ResponseCache(directory=None))
+    return proxy.app.test_client()
+
+def get(client, url, **options):
+    return client.post('/', json={'url': url, 'method': 'GET', 'cache': True, **options})
+
+@pytest.mark.parametrize('kind', ['sized', 'chunked'])
+def test_small_bodies_are_cached(client, upstream, kind):
+    first, second = get(client, f'{upstream}/{kind}/small'), get(client, f'{upstream}/{kind}/small')
+    assert first.data == second.data == SMALL
+    assert (first.headers['X-Proxy-Cache'], second.headers['X-Proxy-Cache']) == ('MISS', 'HIT')
+    assert Upstream.hits[f'/{kind}/small'] == 1
+
+@pytest.mark.parametrize('kind', ['sized', 'chunked'])
+def test_large_bodies_stream_through_uncached(client, upstream, kind):
+    for _ in range(2):
+        response = get(client, f'{upstream}/{kind}/large')
+        assert response.data == LARGE and 'X-Proxy-Cache' not in response.headers
+    assert Upstream.hits[f'/{kind}/large'] == 2
+    assert proxy.response_cache.size == 0
+
+@pytest.mark.parametrize('name', ['Range', 'range', 'RANGE'])
+def test_ranged_requests_are_not_cached(client, upstream, name):
+    partial = get(client, f'{upstream}/sized/small', headers={name: 'bytes=0-9'})
+    assert partial.status_code == 206 and partial.data == SMALL[:10]
+    full = get(client, f'{upstream}/sized/small')
+    assert full.status_code == 200 and full.data == SMALL and full.headers['X-Proxy-Cache'] == 'MISS'
+
+def test_partial_responses_are_not_stored(upstream, monkeypatch):
+    monkeypatch.setattr(proxy, 'response_cache', proxy.ResponseCache(directory=None))
+    response, checkin = proxy.fetch_upstream(f'{upstream}/sized/small', 'GET', {'Range': 'bytes=0-9'}, {}, 5, False)
+    proxy.read_response(response, checkin, 'some-key')
+    assert proxy.response_cache.get('some-key') is None
+
+def test_large_unsized_body_without_streaming(client, upstream):
+    assert get(client, f'{upstream}/chunked/large', stream=False).data == LARGE
+    assert proxy.response_cache.size == 0
+
+def test_batch_reports_oversized_items(client, upstream):
+    items = [{'url': f'{upstream}/{kind}/{size}', 'method': 'GET'} for kind in ['sized', 'chunked'] for size in ['small', 'large']]
+    results = client.post('/batch', json=items).get_json()
+    assert [result['index'] for result in results] == [0, 1, 2, 3]
+    assert results[0]['body'] == results[2]['body'] == SMALL.decode()
+    for result in results[1], results[3]: assert result['status'] == 502 and 'body' not in result and str(proxy.BATCH_ITEM_MAX) in result['error']
+
+def test_ranged_batch_items_are_not_cached(client, upstream):
+    items = [{'url': f'{upstream}/sized/small', 'method': 'GET', 'cache': True, 'headers': {'range': 'bytes=0-9'}}]
+    result, = client.post('/batch', json=items).get_json()
+    assert result['status'] == 206 and result['body'] == SMALL[:10].decode() and 'cache' not in result
+    full = get(client, f'{upstream}/sized/small')
+    assert full.status_code == 200 and full.data == SMALL and full.headers['X-Proxy-Cache'] == 'MISS'
@@ -0,0 +1,117 @@
+import os, sys, time, threading, http.server
+from collections import Counter
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import app as proxy
+
+CLIENTS = 8
+UPSTREAM_DELAY = 0.5 # long enough for every client to arrive while the first fetch is still in flight
+BODY = b'0123456789' * 100_000
+LARGE = bytes(range(256)) * 32768 # 8 MiB, four times the shared buffer the paused-reader tests allow
+
+class Upstream(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = Counter()
+    ranges = []
+    lock = threading.Lock()
+
+    def log_message(self, *args): pass
+
+    def respond(self):
+        with Upstream.lock: Upstream.hits[(self.command, self.path)] += 1
+        if self.path.startswith('/large'): return self.large()
+        if self.command == 'POST': self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(UPSTREAM_DELAY)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def large(self):
+        # LARGE, with Range support only under /large/ranged
+        ranged = self.path.startswith('/large/ranged')
+        start = int(self.headers['Range'][6:].split('-')[0]) if ranged and self.headers.get('Range') else None
+        if start is not None: Upstream.ranges.append(start)
+        body = LARGE[start or 0:]
+        self.send_response(206 if start is not None else 200)
+        self.send_header('Content-Length', str(len(body)))
+        if ranged: self.send_header('Accept-Ranges', 'bytes')
+        if start is not None: self.send_header('Content-Range', f'bytes {start}-{len(LARGE) - 1}/{len(LARGE)}')
+        self.end_headers()
+        try: self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError): pass
+
+    do_GET = do_POST = respond
+
+@pytest.fixture(scope='module')
+def upstream():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+def concurrently(payloads):
+    # Every payload POSTed to / from its own thread at the same moment, responses in payload order
+    barrier = threading.Barrier(len(payloads))
+    responses = [None] * len(payloads)
+    def send(index):
+        client = proxy.app.test_client()
+        barrier.wait()
+        response = client.post('/', json=payloads[index])
+        responses[index] = (response.status_code, response.data)
+    threads = [threading.Thread(target=send, args=(index,)) for index in range(len(payloads))]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    return responses
+
+def test_identical_gets_share_one_fetch(upstream):
+    Upstream.hits.clear()
+    before = dict(proxy.flight_counters)
+    responses = concurrently([{'url': f'{upstream}/shared', 'method': 'GET'}] * CLIENTS)
+    assert responses == [(200, BODY)] * CLIENTS
+    assert Upstream.hits[('GET', '/shared')] == 1
+    assert proxy.flight_counters['fetches'] == before['fetches'] + 1
+    assert proxy.flight_counters['joined'] == before['joined'] + CLIENTS - 1
+
+def test_different_urls_are_not_shared(upstream):
+    Upstream.hits.clear()
+    responses = concurrently([{'url': f'{upstream}/own/{index}', 'method': 'GET'} for index in range(CLIENTS)])
+    assert responses == [(200, BODY)] * CLIENTS
+    assert all(Upstream.hits[('GET', f'/own/{index}')] == 1 for index in range(CLIENTS))
+
+def test_posts_are_not_coalesced(upstream):
+    Upstream.hits.clear()
+    responses = concurrently([{'url': f'{upstream}/submit', 'method': 'POST', 'form_data': {'a': '1'}}] * 3)
+    assert responses == [(200, BODY)] * 3
+    assert Upstream.hits[('POST', '/submit')] == 3
+
+def paused_and_reading(upstream, path, monkeypatch):
+    # Two readers on one shared fetch: the first takes one chunk and stops, the second reads on in a thread
+    monkeypatch.setattr(proxy, 'FLIGHT_BUFFER_BYTES', 2 * 1024 * 1024)
+    monkeypatch.setattr(proxy, 'FLIGHT_STALL_TIMEOUT', 0.2)
+    Upstream.ranges.clear()
+    args = (f'{upstream}{path}', 'GET', {}, {}, 30, False)
+    paused, reading = proxy.fetch_coalesced(*args)[0], proxy.fetch_coalesced(*args)[0]
+    assert paused.flight is reading.flight
+    paused_body = paused.iter_content()
+    first = next(paused_body)
+    received = []
+    thread = threading.Thread(target=lambda: received.extend(reading.iter_content()), daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive() and b''.join(received) == LARGE # not held back by the paused reader
+    return first, paused_body
+
+def test_paused_reader_resumes_with_a_range_fetch(upstream, monkeypatch):
+    dropped, resumed = proxy.flight_counters['dropped'], proxy.flight_counters['resumed']
+    first, rest = paused_and_reading(upstream, '/large/ranged', monkeypatch)
+    assert first + b''.join(rest) == LARGE
+    assert Upstream.ranges == [len(first)]
+    assert (proxy.flight_counters['dropped'], proxy.flight_counters['resumed']) == (dropped + 1, resumed + 1)
+
+def test_paused_reader_fails_without_range_support(upstream, monkeypatch):
+    _, rest = paused_and_reading(upstream, '/large/plain', monkeypatch)
+    with pytest.raises(proxy.ReaderDropped): b''.join(rest)
+    assert Upstream.ranges == []
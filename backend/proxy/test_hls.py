@@ -0,0 +1,130 @@
+import os, sys, re, json, threading, http.server
+from urllib.parse import quote
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import app as proxy
+
+# A synthetic HLS stream served locally: master -> two variants, each with a key, an init map and SEGMENTS segments
+SEGMENTS = 20
+SEGMENT_SIZE = 50_000
+REFERER = 'https://pstream.mov/'
+
+class Upstream(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    fetched = []
+
+    def log_message(self, *args): pass
+
+    def send(self, status, body=b'', content_type='application/octet-stream'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.headers.get('Referer') != REFERER: return self.send(403) # the session's headers have to reach every fetch
+        path = self.path
+        if path == '/v/master.m3u8':
+            self.send(200, ('#EXTM3U\n#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="a",URI="audio/a.m3u8"\n#EXT-X-STREAM-INF:BANDWIDTH=800000,AUDIO="a"\n'
+                            f'low/index.m3u8\n#EXT-X-STREAM-INF:BANDWIDTH=3000000\nhttp://{self.headers["Host"]}/v/high/index.m3u8\n').encode(), proxy.HLS_PLAYLIST_TYPE)
+        elif path.endswith('index.m3u8'):
+            body = '#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXT-X-KEY:METHOD=AES-128,URI="../keys/k.bin"\n#EXT-X-MAP:URI="init.mp4"\n'
+            self.send(200, (body + ''.join(f'#EXTINF:4.0,\nseg{index}.ts\n' for index in range(SEGMENTS)) + '#EXT-X-ENDLIST\n').encode(), proxy.HLS_PLAYLIST_TYPE)
+        elif path.endswith('.ts'):
+            Upstream.fetched.append(path)
+            self.send(200, segment_body(int(re.search(r'seg(\d+)', path).group(1))), 'video/mp2t')
+        elif path.endswith('k.bin'): self.send(200, b'0123456789abcdef')
+        elif path.endswith('init.mp4'): self.send(200, b'init')
+        else: self.send(404)
+
+class DeferredExecutor:
+    # Holds read-ahead jobs until the test runs them, so "queued but not started" can be set up on purpose
+    def __init__(self): self.jobs = []
+    def submit(self, fn, *args): self.jobs.append((fn, args))
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        for fn, args in jobs: fn(*args)
+
+def segment_body(index): return bytes([index]) * SEGMENT_SIZE
+
+@pytest.fixture(scope='module')
+def upstream():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+@pytest.fixture
+def client(upstream, monkeypatch):
+    Upstream.fetched.clear()
+    monkeypatch.setattr(proxy, 'segment_cache', proxy.ResponseCache(max_bytes=proxy.HLS_CACHE_MAX_BYTES, directory=None))
+    return proxy.app.test_client()
+
+def start(client, url):
+    response = client.get(f'/hls?url={quote(url)}&headers={quote(json.dumps({"Referer": REFERER}))}')
+    assert response.status_code == 200 and response.headers['Content-Type'] == proxy.HLS_PLAYLIST_TYPE
+    return response.data.decode()
+
+def local(uri): return uri.replace('http://localhost/', '/')
+
+def uris(playlist): return [line for line in playlist.splitlines() if line.startswith('http')]
+
+def test_playlists_point_back_at_proxy(client, upstream, monkeypatch):
+    monkeypatch.setattr(proxy, 'HLS_PUBLIC_URL', 'https://proxy.example/base/')
+    master = start(client, f'{upstream}/v/master.m3u8')
+    variants = uris(master)
+    assert len(variants) == 2 and all(uri.startswith('https://proxy.example/base/hls/') and '/p/' in uri for uri in variants)
+    assert proxy.decode_uri(variants[0].rsplit('/', 1)[1]) == f'{upstream}/v/low/index.m3u8'
+    audio = re.search(r'URI="([^"]+)"', master).group(1)
+    assert proxy.decode_uri(audio.rsplit('/', 1)[1]) == f'{upstream}/v/audio/a.m3u8'
+
+    media = client.get(variants[1].replace('https://proxy.example/base/', '/')).data.decode()
+    key, init = re.findall(r'URI="([^"]+)"', media)
+    assert '/k/' in key and '/s/' in init
+    assert client.get(key.replace('https://proxy.example/base/', '/')).data == b'0123456789abcdef'
+    assert len(uris(media)) == SEGMENTS
+
+def test_sequential_playback_reads_ahead(client, upstream, monkeypatch):
+    executor = DeferredExecutor()
+    monkeypatch.setattr(proxy, 'hls_executor', executor)
+    segments = uris(start(client, f'{upstream}/v/high/index.m3u8'))
+    hits = proxy.hls_counters['prefetch_hits']
+    for index in range(8):
+        response = client.get(local(segments[index]))
+        assert response.data == segment_body(index)
+        assert response.headers.get('X-Proxy-Cache') == ('HIT' if index else None)
+        executor.run() # the player takes a while over each segment
+    assert proxy.hls_counters['prefetch_hits'] == hits + 7
+    assert len(Upstream.fetched) == len(set(Upstream.fetched)) == 8 + proxy.HLS_PREFETCH_SEGMENTS
+
+def test_player_fetches_queued_segment_itself(client, upstream, monkeypatch):
+    executor = DeferredExecutor()
+    monkeypatch.setattr(proxy, 'hls_executor', executor)
+    segments = uris(start(client, f'{upstream}/v/high/index.m3u8'))
+    assert client.get(local(segments[0])).data == segment_body(0)
+    assert len(executor.jobs) == proxy.HLS_PREFETCH_SEGMENTS
+
+    # Segment 1 is only queued: the player gets it straight away instead of waiting on the job
+    response = client.get(local(segments[1]))
+    assert response.data == segment_body(1) and response.headers.get('X-Proxy-Cache') != 'HIT'
+    skipped = proxy.hls_counters['skipped']
+    executor.run()
+    assert proxy.hls_counters['skipped'] == skipped + 1
+    assert Upstream.fetched.count('/v/high/seg1.ts') == 1
+
+def test_seek_skips_queued_read_ahead(client, upstream, monkeypatch):
+    executor = DeferredExecutor()
+    monkeypatch.setattr(proxy, 'hls_executor', executor)
+    segments = uris(start(client, f'{upstream}/v/high/index.m3u8'))
+    client.get(local(segments[0]))
+    client.get(local(segments[15]))
+    skipped = proxy.hls_counters['skipped']
+    executor.run()
+    assert proxy.hls_counters['skipped'] == skipped + proxy.HLS_PREFETCH_SEGMENTS # 1..3 are behind the player now
+    assert client.get(local(segments[16])).headers.get('X-Proxy-Cache') == 'HIT'
+    assert not any(re.search(r'seg[123]\.ts', path) for path in Upstream.fetched)
+
+def test_unknown_session(client):
+    assert client.get('/hls/nope/s/abc').status_code == 404
@@ -0,0 +1,153 @@
+import requests, asyncio, time
+from collections import OrderedDict
+from terminology import on_yellow, on_red
+
+ANILIST_URL = "https://graphql.anilist.co"
+# Every AniList lookup asks for the same fields, so backdrop_from_media gives the same answer for single and batched ones
+MEDIA_FIELDS = '''
+            id
+            bannerImage
+            coverImage {
+                extraLarge
+            }'''
+MEDIA_QUERY = '''
+query ($id: Int) {
+    Media(id: $id, type: ANIME) {''' + MEDIA_FIELDS + '''
+    }
+}
+'''
+BATCH_QUERY = '''
+query ($ids: [Int]) {
+    Page(page: 1, perPage: 50) {
+        media(id_in: $ids, type: ANIME) {''' + MEDIA_FIELDS + '''
+        }
+    }
+}
+'''
+BATCH_WINDOW = 0.05 # seconds to collect ids before sending one query
+BATCH_MAX = 50 # AniList's page size cap
+CACHE_TTL = 6 * 60 * 60
+CACHE_SIZE = 5000
+
+def backdrop_from_media(media):
+    # Banner first, then the large cover
+    return media.get('bannerImage') or \
+           (media.get('coverImage') or {}).get('extraLarge')
+
+class BackdropCache:
+    def __init__(self, ttl=CACHE_TTL, size=CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, anilist_id):
+        entry = self.entries.get(anilist_id)
+        if not entry or time.time() - entry[0] > self.ttl: return False, None
+        self.entries.move_to_end(anilist_id)
+        return True, entry[1]
+
+    def set(self, anilist_id, backdrop):
+        self.entries[anilist_id] = (time.time(), backdrop)
+        self.entries.move_to_end(anilist_id)
+        while len(self.entries) > self.size: self.entries.popitem(last=False)
+
+cache = BackdropCache()
+
+def retry_delay_for(response, retry_delay):
+    if response is not None and 'Retry-After' in response.headers:
+        try: return int(response.headers['Retry-After'])
+        except ValueError: pass  # Use default delay if header is invalid
+    return retry_delay
+
+def parse_batch(response):
+    media = response.json().get('data', {}).get('Page', {}).get('media', []) or []
+    return {item['id']: backdrop_from_media(item) for item in media}
+
+def fetch_backdrops(anilist_ids, url=ANILIST_URL, max_retries=3, retry_delay=3):
+    # Blocking version for listing pages: one query per 50 uncached ids, returns {id: backdrop}
+    ids = list(dict.fromkeys(int(anilist_id) for anilist_id in anilist_ids))
+    results = {}
+    missing = []
+    for anilist_id in ids:
+        hit, backdrop = cache.get(anilist_id)
+        if hit: results[anilist_id] = backdrop
+        else: missing.append(anilist_id)
+
+    for start in range(0, len(missing), BATCH_MAX):
+        chunk = missing[start:start + BATCH_MAX]
+        response = None
+        for attempt in range(max_retries):
+            try:
+                response = requests.post(url, json={'query': BATCH_QUERY, 'variables': {'ids': chunk}})
+                response.raise_for_status()
+                found = parse_batch(response)
+                for anilist_id in chunk:
+                    results[anilist_id] = found.get(anilist_id)
+                    cache.set(anilist_id, results[anilist_id])
+                break
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    delay = retry_delay_for(response, retry_delay)
+                    print(on_yellow(f"⚠️  Retrying AniList batch (attempt {attempt + 1}/{max_retries}) after {delay}s"))
+                    time.sleep(delay)
+                else:
+                    print(on_red(f"❌ Failed to fetch AniList data after {max_retries} attempts: {e}"))
+                    for anilist_id in chunk: results[anilist_id] = None
+    return results
+
+class AniListBatcher:
+    # Collects backdrop lookups for BATCH_WINDOW and resolves them with a single Page(media(id_in: ...)) query
+    def __init__(self, client, url=ANILIST_URL, window=BATCH_WINDOW, max_retries=3, retry_delay=3):
+        self.client = client
+        self.url = url
+        self.window = window
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.pending = {}
+        self.timer = None
+        self.queries = 0
+        self.tasks = set() # running resolves, the loop only keeps weak references to tasks
+
+    async def backdrop(self, anilist_id):
+        anilist_id = int(anilist_id)
+        hit, backdrop = cache.get(anilist_id)
+        if hit: return backdrop
+
+        future = self.pending.get(anilist_id)
+        if future is None:
+            future = self.pending[anilist_id] = asyncio.get_running_loop().create_future()
+            if len(self.pending) >= BATCH_MAX: self.flush()
+            elif self.timer is None: self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await asyncio.shield(future)
+
+    def flush(self):
+        if self.timer: self.timer.cancel()
+        self.timer = None
+        batch, self.pending = self.pending, {}
+        if batch:
+            task = asyncio.ensure_future(self.resolve(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def resolve(self, batch):
+        ids = list(batch)
+        response = None
+        found = {}
+        for attempt in range(self.max_retries):
+            try:
+                self.queries += 1
+                response = await self.client.post(self.url, json={'query': BATCH_QUERY, 'variables': {'ids': ids}})
+                response.raise_for_status()
+                found = parse_batch(response)
+                for anilist_id in ids: cache.set(anilist_id, found.get(anilist_id))
+                break
+            except Exception as e:
+                if attempt < self.max_retries - 1:
+                    delay = retry_delay_for(response, self.retry_delay)
+                    print(on_yellow(f"⚠️  Retrying AniList batch (attempt {attempt + 1}/{self.max_retries}) after {delay}s"))
+                    await asyncio.sleep(delay)
+                else:
+                    print(on_red(f"❌ Failed to fetch AniList data after {self.max_retries} attempts: {e}"))
+
+        for anilist_id, future in batch.items():
+            if not future.done(): future.set_result(found.get(anilist_id))
@@ -0,0 +1,74 @@
+import os, sys, json, time, asyncio, argparse, threading, http.server
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import httpx
+import episodes, get_anime_data
+from get_anime_data import extract_anime_info, extract_anime_details_async
+from episodes import extract_episodes_list
+
+# End-to-end latency of one anime detail lookup (page, AniList backdrop, episode list) against a local stand-in for
+# hianime and AniList that answers every request after --delay seconds: the blocking calls one after another, against
+# extract_anime_details_async. Every run asks for a new id so the page cache never answers.
+# Run with: python bench_details.py [--delay 0.2] [--runs 5]
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f: return f.read()
+
+class Upstream(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0
+    detail = fixture('detail.html')
+    episodes = fixture('episodes.json')
+
+    def log_message(self, *args): pass
+
+    def respond(self, body, content_type):
+        time.sleep(Upstream.delay)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/ajax/v2/episode/list/'): self.respond(Upstream.episodes, 'application/json')
+        else: self.respond(Upstream.detail, 'text/html; charset=utf-8')
+
+    def do_POST(self):
+        query = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+        media = {'bannerImage': f'https://banner/{query["variables"]["id"]}.jpg'}
+        self.respond(json.dumps({'data': {'Media': media}}).encode(), 'application/json')
+
+def blocking(id): return extract_anime_info(id), extract_episodes_list(id)
+
+async def concurrent(id): return await extract_anime_details_async(id)
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency of one anime detail lookup, blocking against async')
+    parser.add_argument('--delay', type=float, default=0.2, help='seconds the local upstream takes per response')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    Upstream.delay = args.delay
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    get_anime_data.HIANIME_URL = episodes.HIANIME_URL = base
+    get_anime_data.ANILIST_URL = f'{base}/graphql'
+
+    print(f'upstream {args.delay * 1000:g} ms per response, {args.runs} runs each')
+    print(f'{"path":<10}{"best ms":>10}{"mean ms":>10}')
+    for name, lookup in [('blocking', blocking), ('async', lambda id: asyncio.run(concurrent(id)))]:
+        latencies = []
+        for run in range(args.runs):
+            started = time.perf_counter()
+            info, episode_list = lookup(f'bench-{name}-{run}-18154')
+            latencies.append(time.perf_counter() - started)
+            if not info or not info['backdrop_image'] or not episode_list: raise RuntimeError(f'{name}: incomplete result')
+        print(f'{name:<10}{min(latencies) * 1000:>10.1f}{sum(latencies) / len(latencies) * 1000:>10.1f}')
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import os, sys, json, time, tracemalloc, argparse
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import parsing
+from get_anime_data import parse_anime_info
+from episodes import parse_episodes_list
+from search import parse_search_results
+
+# Docs/sec and peak traced allocations of the hianime parsers over the saved pages in fixtures/, per BeautifulSoup backend.
+# Run with: python bench_parsing.py [--runs 200] [--parsers lxml html.parser]
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f: return f.read()
+
+DETAIL = fixture('detail.html')
+SEARCH = fixture('search.html')
+EPISODES = fixture('episodes.json')
+PAGES = {
+    'detail': lambda: parse_anime_info(DETAIL, 'my-hero-academia-season-6-18154'),
+    'episodes': lambda: parse_episodes_list(json.loads(EPISODES)),
+    'search': lambda: parse_search_results(SEARCH),
+}
+
+def measure(parse, runs):
+    parse() # warm the compiled selectors and imports
+    started = time.perf_counter()
+    for _ in range(runs): parse()
+    rate = runs / (time.perf_counter() - started)
+    tracemalloc.start()
+    parse()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rate, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse throughput and allocations of the hianime scrapers per parser backend')
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--parsers', nargs='+', default=['lxml', 'html.parser'])
+    args = parser.parse_args()
+
+    print(f'{args.runs} parses per page')
+    print(f'{"parser":<13}{"page":<10}{"docs/s":>10}{"peak KiB":>10}')
+    for backend in args.parsers:
+        parsing.PARSER = backend
+        for page, parse in PAGES.items():
+            rate, peak = measure(parse, args.runs)
+            print(f'{backend:<13}{page:<10}{rate:>10.1f}{peak / 1024:>10.0f}')
+
+if __name__ == '__main__':
+    main()
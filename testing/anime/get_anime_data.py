@@ -1,6 +1,14 @@
-import requests, json, re, time
-from bs4 import BeautifulSoup
+import requests, httpx, asyncio, json, re, time
+from collections import OrderedDict
+from functools import cached_property
 from terminology import on_yellow, on_red
+from episodes import extract_episodes_list_async
+from anilist import AniListBatcher, ANILIST_URL, MEDIA_QUERY, backdrop_from_media, retry_delay_for
+from parsing import make_soup, css
+
+HIANIME_URL = "https://hianime.nz"
+PAGE_CACHE_TTL = 5 * 60
+PAGE_CACHE_SIZE = 64
 
 def format_title(title, data_id):
     formatted_title = re.sub(r'[^\w\s]', '', title)
@@ -8,41 +16,73 @@ def format_title(title, data_id):
     formatted_title = re.sub(r'\s+', '-', formatted_title)
     return f"{formatted_title}-{data_id}"
 
+SHOW_TYPES = ["tv", "ona", "movie", "ova", "special"]
+
+# Selectors are compiled once here and every field is looked up once per node
+RECOMMENDED_ITEMS = css("#main-content .block_area_category .tab-content .block_area-content .film_list-wrap .flw-item")
+RELATED_ITEMS = css("#main-sidebar .block_area_sidebar .block_area-content .cbox-list .cbox-content .anif-block-ul .ulclear li")
+ITEM_NAME = css(".film-detail .film-name a")
+ITEM_POSTER = css(".film-poster")
+ITEM_POSTER_LINK = css(".film-poster a")
+ITEM_POSTER_IMG = css(".film-poster img")
+ITEM_FDI = css(".film-detail .fd-infor .fdi-item")
+ITEM_DURATION = css(".film-detail .fd-infor .fdi-duration")
+ITEM_TICK = css(".film-detail>.fd-infor>.tick")
+ITEM_TICKS = {property: css(f".tick .tick-{property}") for property in ["sub", "dub", "eps"]}
+ITEM_TICK_RATE = css(".film-poster>.tick-rate")
+
+DETAIL_TITLE = css("#ani_detail .film-name")
+DETAIL_SHOW_TYPE = css("#ani_detail .prebreadcrumb ol li:nth-child(2) a")
+DETAIL_POSTER = css("#ani_detail .film-poster")
+DETAIL_STATS = css("#ani_detail .film-stats")
+DETAIL_STATS_ITEMS = css(".tick-item, span.item")
+DETAIL_INFO_ITEMS = css("#ani_detail > .ani_detail-stage > .container > .anis-content > .anisc-info-wrap > .anisc-info > .item")
+DETAIL_OVERVIEW = css("#ani_detail .film-description .text")
+DETAIL_SYNONYMS = css('.item.item-title:has(.item-head:-soup-contains("Synonyms")) .name')
+DETAIL_SYNC_DATA = css("#syncData")
+INFO_HEAD = css(".item-head")
+INFO_NAME = css(".name")
+INFO_LINKS = css("a")
+IMG = css("img")
+TICK_RATE = css(".tick-rate")
+SEASONS = css(".os-list a")
+SEASON_TITLE = css(".title")
+SEASON_POSTER = css(".season-poster")
+
+def extract_item_ticks(element, tv_info):
+    for property, selector in ITEM_TICKS.items():
+        value = selector.select_one(element)
+        if value:
+            tv_info[property] = value.text.strip()
+
+    tick_rate = ITEM_TICK_RATE.select_one(element)
+    return bool(tick_rate and "18+" in tick_rate.text.strip())
+
 def extract_recommended_data(soup):
-    recommended_elements = soup.select(
-        "#main-content .block_area_category .tab-content .block_area-content .film_list-wrap .flw-item"
-    )
+    recommended_elements = RECOMMENDED_ITEMS.select(soup)
     results = []
     
     for element in recommended_elements:
-        id = element.select_one(".film-detail .film-name a").get('href').split("/")[-1] if element.select_one(".film-detail .film-name a") else None
-        data_id = element.select_one(".film-poster a").get('data-id')
-        title = element.select_one(".film-detail .film-name a").text.strip() if element.select_one(".film-detail .film-name a") else ""
-        japanese_title = element.select_one(".film-detail .film-name a").get('data-jname', "").strip()
-        poster = element.select_one(".film-poster img").get('data-src')
+        name = ITEM_NAME.select_one(element)
+        id = name.get('href').split("/")[-1] if name else None
+        data_id = ITEM_POSTER_LINK.select_one(element).get('data-id')
+        title = name.text.strip() if name else ""
+        japanese_title = name.get('data-jname', "").strip()
+        poster = ITEM_POSTER_IMG.select_one(element).get('data-src')
         
-        fdi_items = element.select(".film-detail .fd-infor .fdi-item")
         show_type = None
-        for item in fdi_items:
-            text = item.text.strip().lower()
-            if any(type in text for type in ["tv", "ona", "movie", "ova", "special"]):
-                show_type = item.text.strip()
+        for item in ITEM_FDI.select(element):
+            text = item.text.strip()
+            if any(type in text.lower() for type in SHOW_TYPES):
+                show_type = text
                 break
-                
+        
+        duration = ITEM_DURATION.select_one(element)
         tv_info = {
             "showType": show_type if show_type else "Unknown",
-            "duration": element.select_one(".film-detail .fd-infor .fdi-duration").text.strip() if element.select_one(".film-detail .fd-infor .fdi-duration") else None
+            "duration": duration.text.strip() if duration else None
         }
-        
-        for property in ["sub", "dub", "eps"]:
-            value = element.select_one(f".tick .tick-{property}")
-            if value:
-                tv_info[property] = value.text.strip()
-                
-        adult_content = False
-        tick_rate = element.select_one(".film-poster>.tick-rate")
-        if tick_rate and "18+" in tick_rate.text.strip():
-            adult_content = True
+        adult_content = extract_item_ticks(element, tv_info)
             
         results.append({
             "data_id": data_id,
@@ -57,39 +97,28 @@ def extract_recommended_data(soup):
     return results
 
 def extract_related_data(soup):
-    related_elements = soup.select(
-        "#main-sidebar .block_area_sidebar .block_area-content .cbox-list .cbox-content .anif-block-ul .ulclear li"
-    )
+    related_elements = RELATED_ITEMS.select(soup)
     results = []
     
     for element in related_elements:
-        id = element.select_one(".film-detail .film-name a").get('href').split("/")[-1] if element.select_one(".film-detail .film-name a") else None
-        data_id = element.select_one(".film-poster").get('data-id')
-        title = element.select_one(".film-detail .film-name a").text.strip() if element.select_one(".film-detail .film-name a") else ""
-        japanese_title = element.select_one(".film-detail .film-name a").get('data-jname', "").strip()
-        poster = element.select_one(".film-poster img").get('data-src')
+        name = ITEM_NAME.select_one(element)
+        id = name.get('href').split("/")[-1] if name else None
+        data_id = ITEM_POSTER.select_one(element).get('data-id')
+        title = name.text.strip() if name else ""
+        japanese_title = name.get('data-jname', "").strip()
+        poster = ITEM_POSTER_IMG.select_one(element).get('data-src')
         
-        fdi_items = element.select(".film-detail>.fd-infor>.tick")
         show_type = None
-        for item in fdi_items:
+        for item in ITEM_TICK.select(element):
             text = item.text.strip().lower()
-            if any(type in text for type in ["tv", "ona", "movie", "ova", "special"]):
-                show_type = next((word for word in text.split() if word.lower() in ["tv", "ona", "movie", "ova", "special"]), None)
+            if any(type in text for type in SHOW_TYPES):
+                show_type = next((word for word in text.split() if word in SHOW_TYPES), None)
                 break
                 
         tv_info = {
             "showType": show_type if show_type else "Unknown"
         }
-        
-        for property in ["sub", "dub", "eps"]:
-            value = element.select_one(f".tick .tick-{property}")
-            if value:
-                tv_info[property] = value.text.strip()
-                
-        adult_content = False
-        tick_rate = element.select_one(".film-poster>.tick-rate")
-        if tick_rate and "18+" in tick_rate.text.strip():
-            adult_content = True
+        adult_content = extract_item_ticks(element, tv_info)
             
         results.append({
             "data_id": data_id,
@@ -103,134 +132,113 @@ def extract_related_data(soup):
         
     return results
 
-def extract_anime_info(id):
-    resp = requests.get(f"https://hianime.nz/{id}")
+def extract_detail_info(soup):
+    # The .anisc-info > .item block, shared by the full and mini extractors
+    anime_info = {}
+    for el in DETAIL_INFO_ITEMS.select(soup):
+        head = INFO_HEAD.select_one(el)
+        key = head.text.strip().replace(":", "") if head else ""
+        if key in ["Genres", "Producers"]:
+            value = [a.text.strip().replace(" ", "-") for a in INFO_LINKS.select(el)]
+        else:
+            name_element = INFO_NAME.select_one(el)
+            value = name_element.text.strip().replace(" ", "-") if name_element else ""
+        anime_info[key] = value
+    return anime_info
 
-    try:
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        
-        # Extract basic information
-        data_id = id.split("-").pop()
-        title_element = soup.select_one("#ani_detail .film-name")
-        show_type = soup.select_one("#ani_detail .prebreadcrumb ol li:nth-child(2) a").text.strip() if soup.select_one("#ani_detail .prebreadcrumb ol li:nth-child(2) a") else ""
-        poster_element = soup.select_one("#ani_detail .film-poster")
-        tv_info_element = soup.select_one("#ani_detail .film-stats")
-        
-        # Extract TV info
+def extract_sync_ids(soup):
+    sync_data_script = DETAIL_SYNC_DATA.select_one(soup)
+    if sync_data_script:
+        try:
+            sync_data = json.loads(sync_data_script.string)
+            return sync_data.get('anilist_id'), sync_data.get('mal_id')
+        except (json.JSONDecodeError, AttributeError) as error:
+            print(f"Error parsing syncData: {error}")
+    return None, None
+
+class AnimePage:
+    # One parsed hianime detail page, each section is computed on first use and memoized
+    def __init__(self, id, html):
+        self.id = id
+        self.html = html
+        self.data_id = id.split("-").pop()
+
+    @cached_property
+    def soup(self):
+        return make_soup(self.html)
+
+    @cached_property
+    def header(self):
+        title_element = DETAIL_TITLE.select_one(self.soup)
+        show_type_element = DETAIL_SHOW_TYPE.select_one(self.soup)
+        title = title_element.text.strip() if title_element else ""
+        return {
+            "data_id": self.data_id,
+            "id": format_title(title, self.data_id),
+            "title": title,
+            "japanese_title": title_element.get('data-jname') if title_element else None,
+            "showType": show_type_element.text.strip() if show_type_element else ""
+        }
+
+    @cached_property
+    def sync_ids(self):
+        return extract_sync_ids(self.soup)
+
+    @cached_property
+    def anime_info(self):
+        return extract_detail_info(self.soup)
+
+    @cached_property
+    def mini(self):
+        anilist_id, mal_id = self.sync_ids
+        header = self.header
+        return {
+            "data_id": header["data_id"],
+            "id": header["id"],
+            "anilistId": anilist_id,
+            "malId": mal_id,
+            "title": header["title"],
+            "japanese_title": header["japanese_title"],
+            "showType": header["showType"],
+            "animeInfo": self.anime_info
+        }
+
+    @cached_property
+    def tv_info(self):
         tv_info = {}
+        tv_info_element = DETAIL_STATS.select_one(self.soup)
         if tv_info_element:
-            for element in tv_info_element.select(".tick-item, span.item"):
+            for element in DETAIL_STATS_ITEMS.select(tv_info_element):
                 text = element.text.strip()
-                if 'tick-quality' in element.get('class', []):
+                classes = element.get('class', [])
+                if 'tick-quality' in classes:
                     tv_info['quality'] = text
-                elif 'tick-sub' in element.get('class', []):
+                elif 'tick-sub' in classes:
                     tv_info['sub'] = text
-                elif 'tick-dub' in element.get('class', []):
+                elif 'tick-dub' in classes:
                     tv_info['dub'] = text
-                elif 'tick-pg' in element.get('class', []):
+                elif 'tick-pg' in classes:
                     tv_info['rating'] = text
-                elif element.name == 'span' and 'item' in element.get('class', []):
+                elif element.name == 'span' and 'item' in classes:
                     if 'showType' not in tv_info:
                         tv_info['showType'] = text
                     elif 'duration' not in tv_info:
                         tv_info['duration'] = text
-        
-        # Extract main elements
-        elements = soup.select("#ani_detail > .ani_detail-stage > .container > .anis-content > .anisc-info-wrap > .anisc-info > .item")
-        overview_element = soup.select_one("#ani_detail .film-description .text")
-        
-        # Extract title information
-        title = title_element.text.strip() if title_element else ""
-        japanese_title = title_element.get('data-jname') if title_element else None
-        synonyms = soup.select_one('.item.item-title:has(.item-head:-soup-contains("Synonyms")) .name')
-        synonyms = synonyms.text.strip() if synonyms else ""
-        poster = poster_element.select_one("img").get('src') if poster_element and poster_element.select_one("img") else None
-        
-        # Extract sync data
-        sync_data_script = soup.select_one("#syncData")
-        anilist_id = None
-        mal_id = None
-        
-        if sync_data_script:
-            try:
-                sync_data = json.loads(sync_data_script.string)
-                anilist_id = sync_data.get('anilist_id')
-                mal_id = sync_data.get('mal_id')
-            except (json.JSONDecodeError, AttributeError) as error:
-                print(f"Error parsing syncData: {error}")
-
-        # New AniList API integration
-        backdrop_image = None
-        if anilist_id:
-            max_retries = 3
-            retry_delay = 3  # seconds
-            for attempt in range(max_retries):
-                try:
-                    anilist_query = '''
-                    query ($id: Int) {
-                        Media(id: $id, type: ANIME) {
-                            bannerImage
-                        }
-                    }
-                    '''
-                    variables = {'id': int(anilist_id)}
-                    response = requests.post(
-                        'https://graphql.anilist.co',
-                        json={'query': anilist_query, 'variables': variables}
-                    )
-                    response.raise_for_status()
-                    media_data = response.json().get('data', {}).get('Media', {})
-                    backdrop_image = media_data.get('bannerImage') or \
-                                   media_data.get('coverImage', {}).get('extraLarge')
-                    break
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        delay = retry_delay
-                        if response and 'Retry-After' in response.headers:
-                            try: delay = int(response.headers['Retry-After'])
-                            except ValueError: pass  # Use default delay if header is invalid
-                        
-                        print(on_yellow(f"⚠️  Retrying AniList request (attempt {attempt + 1}/{max_retries}) after {delay}s"))
-                        time.sleep(delay)
-                    else:
-                        print(on_red(f"❌ Failed to fetch AniList data after {max_retries} attempts: {e}"))
-                        backdrop_image = None
-
-        # Extract anime info
-        anime_info = {}
-        for el in elements:
-            key = el.select_one(".item-head").text.strip().replace(":", "") if el.select_one(".item-head") else ""
-            if key in ["Genres", "Producers"]:
-                value = [a.text.strip().replace(" ", "-") for a in el.select("a")]
-            else:
-                name_element = el.select_one(".name")
-                value = name_element.text.strip().replace(" ", "-") if name_element else ""
-            anime_info[key] = value
-        
-        # Add overview and TV info
-        season_id = format_title(title, data_id)
-        anime_info["Overview"] = overview_element.text.strip() if overview_element else ""
-        anime_info["tvInfo"] = tv_info
-        
-        # Check for adult content
-        adult_content = False
-        if poster_element:
-            tick_rate = poster_element.select_one(".tick-rate")
-            if tick_rate and "18+" in tick_rate.text.strip():
-                adult_content = True
-        
+        return tv_info
+
+    @cached_property
+    def seasons(self):
         seasons = []
-        season_elements = soup.select(".os-list a")
-        for el in season_elements:
-            route = el.get('href', "") if el else ""
+        for el in SEASONS.select(self.soup):
+            route = el.get('href', "")
             
-            name_element = el.select_one(".title")
+            name_element = SEASON_TITLE.select_one(el)
             name = name_element.text.strip() if name_element else ""
             
             background = ""
-            poster_element = el.select_one(".season-poster")
-            if poster_element and poster_element.get('style'):
-                style = poster_element.get('style')
+            season_poster = SEASON_POSTER.select_one(el)
+            style = season_poster.get('style') if season_poster else None
+            if style:
                 bg_match = re.search(r'url\(([^)]+)\)', style)
                 if bg_match:
                     background = bg_match.group(1)
@@ -240,86 +248,187 @@ def extract_anime_info(id):
                 "route": route,
                 "background": background
             })
-            
-        # Extract recommended and related data
-        recommended_data = extract_recommended_data(soup)
-        related_data = extract_related_data(soup)
+        return seasons
+
+    @cached_property
+    def recommended(self):
+        return extract_recommended_data(self.soup)
+
+    @cached_property
+    def related(self):
+        return extract_related_data(self.soup)
+
+    @cached_property
+    def full(self):
+        soup = self.soup
+        header = self.header
+        anilist_id, mal_id = self.sync_ids
+        poster_element = DETAIL_POSTER.select_one(soup)
+        
+        # Extract title information
+        synonyms = DETAIL_SYNONYMS.select_one(soup)
+        synonyms = synonyms.text.strip() if synonyms else ""
+        poster_img = IMG.select_one(poster_element) if poster_element else None
+        poster = poster_img.get('src') if poster_img else None
+        
+        # Add overview and TV info on top of the mini animeInfo
+        overview_element = DETAIL_OVERVIEW.select_one(soup)
+        anime_info = dict(self.anime_info)
+        anime_info["Overview"] = overview_element.text.strip() if overview_element else ""
+        anime_info["tvInfo"] = self.tv_info
+        
+        # Check for adult content
+        adult_content = False
+        if poster_element:
+            tick_rate = TICK_RATE.select_one(poster_element)
+            if tick_rate and "18+" in tick_rate.text.strip():
+                adult_content = True
         
-        # Return the final result
         result = {
             "adultContent": adult_content,
-            "data_id": data_id,
-            "id": season_id,
+            "data_id": header["data_id"],
+            "id": header["id"],
             "anilistId": anilist_id,
             "malId": mal_id,
-            "title": title,
-            "japanese_title": japanese_title,
+            "title": header["title"],
+            "japanese_title": header["japanese_title"],
             "synonyms": synonyms,
             "poster": poster,
-            "backdrop_image": backdrop_image,
-            "showType": show_type,
+            "backdrop_image": None,
+            "showType": header["showType"],
             "animeInfo": anime_info,
-            "seasons": seasons,
-            "recommended_data": recommended_data,
-            "related_data": related_data
+            "seasons": self.seasons,
+            "recommended_data": self.recommended,
+            "related_data": self.related
         }
         
+        # Every section is memoized now, so the tree can go
+        del self.soup
+        return result
+
+class PageCache:
+    # Recently parsed pages, so mini then full (or a retry) for the same id is one fetch and one parse
+    def __init__(self, ttl=PAGE_CACHE_TTL, size=PAGE_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, id):
+        entry = self.entries.get(id)
+        if not entry or time.time() - entry[0] > self.ttl: return None
+        self.entries.move_to_end(id)
+        return entry[1]
+
+    def set(self, id, page):
+        self.entries[id] = (time.time(), page)
+        self.entries.move_to_end(id)
+        while len(self.entries) > self.size: self.entries.popitem(last=False)
+
+page_cache = PageCache()
+
+def get_anime_page(id):
+    page = page_cache.get(id)
+    if page is None:
+        response = requests.get(f"{HIANIME_URL}/{id}")
+        response.raise_for_status() # an error page would parse to an empty anime and stay cached for PAGE_CACHE_TTL
+        page = AnimePage(id, response.text)
+        page_cache.set(id, page)
+    return page
+
+async def get_anime_page_async(id, client):
+    page = page_cache.get(id)
+    if page is None:
+        response = await client.get(f"{HIANIME_URL}/{id}")
+        response.raise_for_status()
+        page = AnimePage(id, response.text)
+        page_cache.set(id, page)
+    return page
+
+def parse_anime_info(html, id):
+    # Everything on the hianime page, backdrop_image is filled in from AniList afterwards
+    return dict(AnimePage(id, html).full)
+
+def fetch_anilist_backdrop(anilist_id, max_retries=3, retry_delay=3):
+    response = None
+    for attempt in range(max_retries):
+        try:
+            variables = {'id': int(anilist_id)}
+            response = requests.post(ANILIST_URL, json={'query': MEDIA_QUERY, 'variables': variables})
+            response.raise_for_status()
+            return backdrop_from_media(response.json().get('data', {}).get('Media') or {})
+        except Exception as e:
+            if attempt < max_retries - 1:
+                delay = retry_delay_for(response, retry_delay)
+                print(on_yellow(f"⚠️  Retrying AniList request (attempt {attempt + 1}/{max_retries}) after {delay}s"))
+                time.sleep(delay)
+            else:
+                print(on_red(f"❌ Failed to fetch AniList data after {max_retries} attempts: {e}"))
+    return None
+
+def extract_anime_info(id):
+    try:
+        page = get_anime_page(id)
+        result = dict(page.full) # memoized, the backdrop goes on a copy
+        if result["anilistId"]: result["backdrop_image"] = fetch_anilist_backdrop(result["anilistId"])
         return result
     except Exception as e:
         print(f"Error extracting anime info: {e}")
         return None
 
-def extract_mini_anime_info(id):
-    resp = requests.get(f"https://hianime.nz/{id}")
-    
-    try:
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        data_id = id.split("-").pop()
-        
-        # Extract core fields
-        title_element = soup.select_one("#ani_detail .film-name")
-        title = title_element.text.strip() if title_element else ""
-        japanese_title = title_element.get('data-jname') if title_element else None
-        show_type = soup.select_one("#ani_detail .prebreadcrumb ol li:nth-child(2) a").text.strip() if soup.select_one("#ani_detail .prebreadcrumb ol li:nth-child(2) a") else ""
-        
-        # Extract anime info
-        anime_info = {}
-        elements = soup.select("#ani_detail > .ani_detail-stage > .container > .anis-content > .anisc-info-wrap > .anisc-info > .item")
-        for el in elements:
-            key = el.select_one(".item-head").text.strip().replace(":", "") if el.select_one(".item-head") else ""
-            if key in ["Genres", "Producers"]:
-                value = [a.text.strip().replace(" ", "-") for a in el.select("a")]
+async def fetch_anilist_backdrop_async(client, anilist_id, max_retries=3, retry_delay=3):
+    # Same retries as fetch_anilist_backdrop, but the backoff doesn't block the event loop
+    response = None
+    for attempt in range(max_retries):
+        try:
+            variables = {'id': int(anilist_id)}
+            response = await client.post(ANILIST_URL, json={'query': MEDIA_QUERY, 'variables': variables})
+            response.raise_for_status()
+            return backdrop_from_media(response.json().get('data', {}).get('Media') or {})
+        except Exception as e:
+            if attempt < max_retries - 1:
+                delay = retry_delay_for(response, retry_delay)
+                print(on_yellow(f"⚠️  Retrying AniList request (attempt {attempt + 1}/{max_retries}) after {delay}s"))
+                await asyncio.sleep(delay)
             else:
-                name_element = el.select_one(".name")
-                value = name_element.text.strip().replace(" ", "-") if name_element else ""
-            anime_info[key] = value
-
-        # Extract sync IDs
-        sync_data_script = soup.select_one("#syncData")
-        anilist_id = None
-        mal_id = None
-        if sync_data_script:
-            try:
-                sync_data = json.loads(sync_data_script.string)
-                anilist_id = sync_data.get('anilist_id')
-                mal_id = sync_data.get('mal_id')
-            except (json.JSONDecodeError, AttributeError):
-                pass
+                print(on_red(f"❌ Failed to fetch AniList data after {max_retries} attempts: {e}"))
+    return None
 
-        return {
-            "data_id": data_id,
-            "id": format_title(title, data_id),
-            "anilistId": anilist_id,
-            "malId": mal_id,
-            "title": title,
-            "japanese_title": japanese_title,
-            "showType": show_type,
-            "animeInfo": anime_info
-        }
+async def extract_anime_info_async(id, client, anilist=None):
+    # Pass an AniListBatcher to fold the AniList lookup into one query with other concurrent calls
+    try:
+        page = await get_anime_page_async(id, client)
+        result = dict(page.full)
+        if result["anilistId"] and anilist: result["backdrop_image"] = await anilist.backdrop(result["anilistId"])
+        elif result["anilistId"]: result["backdrop_image"] = await fetch_anilist_backdrop_async(client, result["anilistId"])
+        return result
+    except Exception as e:
+        print(f"Error extracting anime info: {e}")
+        return None
+
+async def extract_anime_details_async(id, client=None, anilist=None):
+    # Page (+ AniList once the page gives us the id) and the episode list run concurrently over one client
+    if client is None:
+        async with httpx.AsyncClient(follow_redirects=True) as client: return await extract_anime_details_async(id, client, anilist)
+
+    return tuple(await asyncio.gather(extract_anime_info_async(id, client, anilist), extract_episodes_list_async(id, client)))
+
+async def extract_many_anime_info_async(ids, client=None):
+    # For listing pages: every page fetch runs concurrently and all AniList lookups share batched queries
+    if client is None:
+        async with httpx.AsyncClient(follow_redirects=True) as client: return await extract_many_anime_info_async(ids, client)
+
+    anilist = AniListBatcher(client, ANILIST_URL)
+    return await asyncio.gather(*[extract_anime_info_async(id, client, anilist) for id in ids])
+
+def extract_mini_anime_info(id):
+    try:
+        page = get_anime_page(id)
+        return dict(page.mini)
     except Exception as e:
         print(f"Error extracting mini anime info: {e}")
         return None
 
-anime_info = extract_anime_info("my-hero-academia-season-6-18154")
-with open("data.json", "w") as f:
-    f.write(json.dumps(anime_info, indent=2))
\ No newline at end of file
+if __name__ == "__main__":
+    anime_info = extract_anime_info("my-hero-academia-season-6-18154")
+    with open("data.json", "w") as f:
+        f.write(json.dumps(anime_info, indent=2))
\ No newline at end of file
@@ -0,0 +1,19 @@
+import os
+import soupsieve
+from bs4 import BeautifulSoup
+
+# lxml builds the tree several times faster than html.parser, HIANIME_PARSER=html.parser forces the old backend
+try:
+    import lxml
+    DEFAULT_PARSER = "lxml"
+except ImportError:
+    DEFAULT_PARSER = "html.parser"
+
+PARSER = os.environ.get("HIANIME_PARSER", DEFAULT_PARSER)
+
+def make_soup(html):
+    return BeautifulSoup(html, PARSER)
+
+def css(selector):
+    # Compiled once at import, then .select(node) / .select_one(node) skip selector parsing on every call
+    return soupsieve.compile(selector)
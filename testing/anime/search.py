@@ -1,118 +1,171 @@
-import requests, json
-from bs4 import BeautifulSoup
+import requests, httpx, asyncio, json
+from contextlib import aclosing
+from parsing import make_soup, css
 
 DEFAULT_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
     "Accept-Encoding": "gzip, deflate, br"
 }
+SEARCH_URL = "https://hianime.nz/search"
+SEARCH_CONCURRENCY = 4
+
+RESULT_ITEMS = css("#main-content .film_list-wrap .flw-item")
+LAST_PAGE = css('.pre-pagination nav .pagination > .page-item a[title="Last"]')
+NEXT_PAGE = css('.pre-pagination nav .pagination > .page-item a[title="Next"]')
+ACTIVE_PAGE = css(".pre-pagination nav .pagination > .page-item.active a")
+FILM_NAME = css(".film-detail .film-name .dynamic-name")
+POSTER = css(".film-poster .film-poster-img")
+DURATION = css(".film-detail .fd-infor .fdi-item.fdi-duration")
+SHOW_TYPE = css(".film-detail .fd-infor .fdi-item:nth-of-type(1)")
+RATING = css(".film-poster .tick-rate")
+COUNTS = {key: css(f".film-poster .tick-{key}") for key in ["sub", "dub", "eps"]}
+
+def tick_count(element, key):
+    count_element = COUNTS[key].select_one(element)
+    text = count_element.text.strip() if count_element else ""
+    if not text: return None
+    try:
+        return int(text.split()[-1])
+    except (ValueError, IndexError):
+        return None
+
+def search_url(search_term, page):
+    return f"{SEARCH_URL}?keyword={search_term}&page={page}"
+
+def parse_search_results(html):
+    soup = make_soup(html)
+    elements = RESULT_ITEMS.select(soup)
+
+    # Extract total pages
+    last_page = LAST_PAGE.select_one(soup)
+    next_page = NEXT_PAGE.select_one(soup)
+    active_page = ACTIVE_PAGE.select_one(soup)
+
+    total_page = 1
+    if last_page and 'href' in last_page.attrs:
+        total_page = int(last_page['href'].split('=')[-1])
+    elif next_page and 'href' in next_page.attrs:
+        total_page = int(next_page['href'].split('=')[-1])
+    elif active_page:
+        total_page = int(active_page.text.strip())
+
+    # Extract search results
+    results = []
+    for element in elements:
+        film_name = FILM_NAME.select_one(element)
+
+        # Get anime ID
+        anime_id = None
+        if film_name and 'href' in film_name.attrs:
+            href = film_name['href']
+            anime_id = href[1:].split("?ref=search")[0] if href else None
+
+        # Get poster
+        poster = POSTER.select_one(element)
+        poster_url = poster['data-src'].strip() if poster and 'data-src' in poster.attrs else None
+
+        # Get duration
+        duration = DURATION.select_one(element)
+        duration_text = duration.text.strip() if duration else None
+
+        # Get show type
+        show_type = SHOW_TYPE.select_one(element)
+        show_type_text = show_type.text.strip() if show_type else "Unknown"
+
+        # Get rating
+        rating = RATING.select_one(element)
+        rating_text = rating.text.strip() if rating else None
+
+        # Get sub, dub and episode counts
+        sub_count = tick_count(element, "sub")
+        dub_count = tick_count(element, "dub")
+        eps_count = tick_count(element, "eps")
+
+        # Get Japanese title
+        japanese_title = None
+        if film_name and 'data-jname' in film_name.attrs:
+            japanese_title = film_name['data-jname'].strip()
+
+        # Create result object
+        result = {
+            "id": anime_id,
+            "title": film_name.text.strip() if film_name else None,
+            "japanese_title": japanese_title,
+            "poster": poster_url,
+            "duration": duration_text,
+            "tvInfo": {
+                "showType": show_type_text,
+                "rating": rating_text,
+                "sub": sub_count,
+                "dub": dub_count,
+                "eps": eps_count
+            }
+        }
+        results.append(result)
+
+    return int(total_page), results if results else []
 
 def extract_search_results(search_term, page=1):
     try:
-        url = f"https://hianime.nz/search?keyword={search_term}&page={page}"
-        response = requests.get(url, headers=DEFAULT_HEADERS)
+        response = requests.get(search_url(search_term, page), headers=DEFAULT_HEADERS)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        elements = soup.select("#main-content .film_list-wrap .flw-item")
-        
-        # Extract total pages
-        last_page = soup.select_one('.pre-pagination nav .pagination > .page-item a[title="Last"]')
-        next_page = soup.select_one('.pre-pagination nav .pagination > .page-item a[title="Next"]')
-        active_page = soup.select_one(".pre-pagination nav .pagination > .page-item.active a")
-        
-        total_page = 1
-        if last_page and 'href' in last_page.attrs:
-            total_page = int(last_page['href'].split('=')[-1])
-        elif next_page and 'href' in next_page.attrs:
-            total_page = int(next_page['href'].split('=')[-1])
-        elif active_page:
-            total_page = int(active_page.text.strip())
-        
-        # Extract search results
-        results = []
-        for element in elements:
-            film_name = element.select_one(".film-detail .film-name .dynamic-name")
-            
-            # Get anime ID
-            anime_id = None
-            if film_name and 'href' in film_name.attrs:
-                href = film_name['href']
-                anime_id = href[1:].split("?ref=search")[0] if href else None
-            
-            # Get poster
-            poster = element.select_one(".film-poster .film-poster-img")
-            poster_url = poster['data-src'].strip() if poster and 'data-src' in poster.attrs else None
-            
-            # Get duration
-            duration = element.select_one(".film-detail .fd-infor .fdi-item.fdi-duration")
-            duration_text = duration.text.strip() if duration else None
-            
-            # Get show type
-            show_type = element.select_one(".film-detail .fd-infor .fdi-item:nth-of-type(1)")
-            show_type_text = show_type.text.strip() if show_type else "Unknown"
-            
-            # Get rating
-            rating = element.select_one(".film-poster .tick-rate")
-            rating_text = rating.text.strip() if rating else None
-            
-            # Get sub count
-            sub_element = element.select_one(".film-poster .tick-sub")
-            sub_count = None
-            if sub_element and sub_element.text.strip():
-                try:
-                    sub_count = int(sub_element.text.strip().split()[-1])
-                except (ValueError, IndexError):
-                    sub_count = None
-            
-            # Get dub count
-            dub_element = element.select_one(".film-poster .tick-dub")
-            dub_count = None
-            if dub_element and dub_element.text.strip():
-                try:
-                    dub_count = int(dub_element.text.strip().split()[-1])
-                except (ValueError, IndexError):
-                    dub_count = None
-            
-            # Get episode count
-            eps_element = element.select_one(".film-poster .tick-eps")
-            eps_count = None
-            if eps_element and eps_element.text.strip():
-                try:
-                    eps_count = int(eps_element.text.strip().split()[-1])
-                except (ValueError, IndexError):
-                    eps_count = None
-            
-            # Get Japanese title
-            japanese_title = None
-            if film_name and 'data-jname' in film_name.attrs:
-                japanese_title = film_name['data-jname'].strip()
-            
-            # Create result object
-            result = {
-                "id": anime_id,
-                "title": film_name.text.strip() if film_name else None,
-                "japanese_title": japanese_title,
-                "poster": poster_url,
-                "duration": duration_text,
-                "tvInfo": {
-                    "showType": show_type_text,
-                    "rating": rating_text,
-                    "sub": sub_count,
-                    "dub": dub_count,
-                    "eps": eps_count
-                }
-            }
-            results.append(result)
-        
-        return int(total_page), results if results else []
+        return parse_search_results(response.text)
     
     except Exception as e:
         print(f"Error fetching search results: {e}")
         return 0, []
 
-query = "horimiya"
-page = 1
+async def fetch_search_page(client, search_term, page):
+    response = await client.get(search_url(search_term, page), headers=DEFAULT_HEADERS)
+    response.raise_for_status()
+    return parse_search_results(response.text)
+
+async def iter_search_results(search_term, client=None, concurrency=SEARCH_CONCURRENCY, max_pages=None):
+    # Page 1 tells us total_page, the rest are fetched concurrently and yielded in the order pages finish
+    # Breaking out (or aclose()) cancels whatever pages are still in flight
+    if client is None:
+        # aclosing: an early exit closes the inner generator (and cancels its pages) before the client goes away
+        async with httpx.AsyncClient(follow_redirects=True) as client, aclosing(iter_search_results(search_term, client, concurrency, max_pages)) as results:
+            async for result in results: yield result
+        return
+
+    try:
+        total_page, results = await fetch_search_page(client, search_term, 1)
+    except Exception as e:
+        print(f"Error fetching search results: {e}")
+        return
+    for result in results: yield result
+
+    if max_pages: total_page = min(total_page, max_pages)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page):
+        async with semaphore: return await fetch_search_page(client, search_term, page)
+
+    tasks = [asyncio.ensure_future(fetch(page)) for page in range(2, total_page + 1)]
+    try:
+        for done in asyncio.as_completed(tasks):
+            try:
+                _, results = await done
+            except Exception as e:
+                print(f"Error fetching search results: {e}")
+                continue
+            for result in results: yield result
+    finally:
+        for task in tasks: task.cancel()
+
+async def collect_search_results(search_term, limit=None, **kwargs):
+    # Convenience wrapper: stops fetching as soon as `limit` results are in
+    found = []
+    async with aclosing(iter_search_results(search_term, **kwargs)) as results:
+        async for result in results:
+            found.append(result)
+            if limit and len(found) >= limit: break
+    return found
+if __name__ == "__main__":
+    query = "horimiya"
+    page = 1
 
-total_pages, data = extract_search_results(query, page)
-print(json.dumps(data, indent=2))
\ No newline at end of file
+    total_pages, data = extract_search_results(query, page)
+    print(json.dumps(data, indent=2))
\ No newline at end of file
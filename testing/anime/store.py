@@ -0,0 +1,139 @@
+import requests, sqlite3, threading, json, time, os
+from get_anime_data import HIANIME_URL, AnimePage, page_cache, fetch_anilist_backdrop
+from episodes import extract_episodes_list
+from search import extract_search_results
+
+STORE_PATH = os.environ.get("HIANIME_STORE", "hianime.db")
+ANIME_MAX_AGE = 24 * 60 * 60 # refetch the page anyway after this, even if the episode count didn't move
+EPISODES_MAX_AGE = 60 * 60
+SEARCH_MAX_AGE = 60 * 60
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS anime (id TEXT PRIMARY KEY, data TEXT NOT NULL, etag TEXT, last_modified TEXT, total_episodes INTEGER, fetched_at REAL, checked_at REAL);
+CREATE TABLE IF NOT EXISTS episodes (id TEXT PRIMARY KEY, data TEXT NOT NULL, total_episodes INTEGER, checked_at REAL);
+CREATE TABLE IF NOT EXISTS search (term TEXT, page INTEGER, total_pages INTEGER, data TEXT NOT NULL, checked_at REAL, PRIMARY KEY (term, page));
+'''
+
+class AnimeStore:
+    # Scraped anime info, episode lists and search pages keyed by hianime id
+    # Reads never leave the database, refresh_* go upstream only when something may have changed
+    def __init__(self, path=STORE_PATH):
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.counters = {"fetched": 0, "not_modified": 0, "unchanged": 0}
+
+    def row(self, query, *args):
+        with self.lock: return self.db.execute(query, args).fetchone()
+
+    def write(self, query, *args):
+        with self.lock: self.db.execute(query, args)
+
+    def anime(self, id):
+        row = self.row("SELECT data FROM anime WHERE id = ?", id)
+        return json.loads(row["data"]) if row else None
+
+    def episodes(self, id):
+        row = self.row("SELECT data FROM episodes WHERE id = ?", id)
+        return json.loads(row["data"]) if row else None
+
+    def search(self, term, page=1):
+        row = self.row("SELECT total_pages, data FROM search WHERE term = ? AND page = ?", term.lower(), page)
+        return (row["total_pages"], json.loads(row["data"])) if row else None
+
+    def put_anime(self, id, data, etag=None, last_modified=None, total_episodes=None):
+        now = time.time()
+        self.write("INSERT OR REPLACE INTO anime VALUES (?, ?, ?, ?, ?, ?, ?)", id, json.dumps(data), etag, last_modified, total_episodes, now, now)
+
+    def put_episodes(self, id, data):
+        self.write("INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?)", id, json.dumps(data), data["totalEpisodes"], time.time())
+
+    def put_search(self, term, page, total_pages, data):
+        self.write("INSERT OR REPLACE INTO search VALUES (?, ?, ?, ?, ?)", term.lower(), page, total_pages, json.dumps(data), time.time())
+
+    def refresh_episodes(self, id, max_age=EPISODES_MAX_AGE):
+        # Returns (episode list, episodes that weren't in the store before), only the new ones need follow-up fetches
+        row = self.row("SELECT data, total_episodes, checked_at FROM episodes WHERE id = ?", id)
+        if row and time.time() - row["checked_at"] < max_age: return json.loads(row["data"]), []
+
+        fresh = extract_episodes_list(id)
+        if not fresh: return (json.loads(row["data"]) if row else None), [] # upstream failed, keep what we have
+        if row and row["total_episodes"] == fresh["totalEpisodes"]:
+            self.counters["unchanged"] += 1
+            self.write("UPDATE episodes SET checked_at = ? WHERE id = ?", time.time(), id)
+            return json.loads(row["data"]), []
+
+        known = {episode["id"] for episode in json.loads(row["data"])["episodes"]} if row else set()
+        self.put_episodes(id, fresh)
+        return fresh, [episode for episode in fresh["episodes"] if episode["id"] not in known]
+
+    def refresh_anime(self, id, max_age=ANIME_MAX_AGE):
+        row = self.row("SELECT data, etag, last_modified, total_episodes, fetched_at FROM anime WHERE id = ?", id)
+        headers = {}
+        if row:
+            if row["etag"]: headers["If-None-Match"] = row["etag"]
+            if row["last_modified"]: headers["If-Modified-Since"] = row["last_modified"]
+            if not headers and time.time() - row["fetched_at"] < max_age:
+                # No validators from hianime, so a moved episode count is what tells us the page changed
+                episodes, _ = self.refresh_episodes(id)
+                if episodes is None or episodes.get("totalEpisodes") == row["total_episodes"]:
+                    self.counters["unchanged"] += 1
+                    self.write("UPDATE anime SET checked_at = ? WHERE id = ?", time.time(), id)
+                    return json.loads(row["data"])
+
+        response = requests.get(f"{HIANIME_URL}/{id}", headers=headers)
+        if response.status_code == 304:
+            self.counters["not_modified"] += 1
+            self.write("UPDATE anime SET checked_at = ? WHERE id = ?", time.time(), id)
+            return json.loads(row["data"])
+        if not response.ok:
+            # An error page parses to an empty anime, keep the stored row instead
+            print(f"Error fetching anime {id}: HTTP {response.status_code}")
+            return json.loads(row["data"]) if row else None
+
+        try:
+            page = AnimePage(id, response.text)
+            page_cache.set(id, page)
+            result = dict(page.full)
+            if result["anilistId"]: result["backdrop_image"] = fetch_anilist_backdrop(result["anilistId"])
+        except Exception as e:
+            print(f"Error extracting anime info: {e}")
+            return json.loads(row["data"]) if row else None
+
+        self.counters["fetched"] += 1
+        episodes, _ = self.refresh_episodes(id) # remember the count the page was fetched at
+        self.put_anime(id, result, response.headers.get("ETag"), response.headers.get("Last-Modified"), episodes["totalEpisodes"] if episodes else None)
+        return result
+
+    def refresh_search(self, term, page=1, max_age=SEARCH_MAX_AGE):
+        row = self.row("SELECT total_pages, data, checked_at FROM search WHERE term = ? AND page = ?", term.lower(), page)
+        if row and time.time() - row["checked_at"] < max_age: return row["total_pages"], json.loads(row["data"])
+
+        total_pages, results = extract_search_results(term, page)
+        if not total_pages: return (row["total_pages"], json.loads(row["data"])) if row else (0, [])
+        self.put_search(term, page, total_pages, results)
+        return total_pages, results
+
+    def get_anime(self, id):
+        # Store first, upstream only for ids we have never seen
+        return self.anime(id) or self.refresh_anime(id)
+
+    def get_episodes(self, id):
+        return self.episodes(id) or self.refresh_episodes(id)[0]
+
+    def get_search(self, term, page=1):
+        return self.search(term, page) or self.refresh_search(term, page)
+
+    def stats(self):
+        counts = {table: self.row(f"SELECT COUNT(*) FROM {table}")[0] for table in ["anime", "episodes", "search"]}
+        return {**counts, **self.counters}
+
+if __name__ == "__main__":
+    store = AnimeStore()
+    id = "my-hero-academia-season-6-18154"
+    store.refresh_episodes(id)
+    anime_info = store.refresh_anime(id)
+    print(json.dumps(store.stats(), indent=2))
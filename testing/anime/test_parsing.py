@@ -0,0 +1,37 @@
+import os, sys, json
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import parsing
+from get_anime_data import parse_anime_info
+from episodes import parse_episodes_list
+from search import parse_search_results
+
+# Saved hianime pages: the lxml tree must give exactly what the old html.parser tree gave
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DETAIL_ID = 'my-hero-academia-season-6-18154'
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f: return f.read()
+
+def parse_all():
+    return {'info': parse_anime_info(fixture('detail.html'), DETAIL_ID),
+            'episodes': parse_episodes_list(json.loads(fixture('episodes.json'))),
+            'search': parse_search_results(fixture('search.html'))}
+
+@pytest.fixture
+def outputs(monkeypatch):
+    def parse_with(parser):
+        monkeypatch.setattr(parsing, 'PARSER', parser)
+        return parse_all()
+    return parse_with
+
+def test_lxml_matches_html_parser(outputs):
+    pytest.importorskip('lxml')
+    assert json.dumps(outputs('lxml')) == json.dumps(outputs('html.parser'))
+
+def test_fixtures_parse_to_something(outputs):
+    result = outputs(parsing.PARSER)
+    assert result['info']['title'] and result['info']['anilistId']
+    assert result['episodes']['totalEpisodes'] == len(result['episodes']['episodes'])
+    total_pages, results = result['search']
+    assert total_pages and results
@@ -0,0 +1,61 @@
+import os, sys, time, asyncio, threading, http.server
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import search
+
+# A local search endpoint that serves the saved results page (12 pages) after DELAY, tracking how many are in flight
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DELAY = 0.2
+with open(os.path.join(FIXTURES, 'search.html'), 'rb') as f: PAGE = f.read()
+TOTAL_PAGES, PAGE_RESULTS = search.parse_search_results(PAGE.decode())
+
+class Upstream(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    lock = threading.Lock()
+    started = []
+    in_flight = 0
+    most_in_flight = 0
+
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        with Upstream.lock:
+            Upstream.started.append(self.path)
+            Upstream.in_flight += 1
+            Upstream.most_in_flight = max(Upstream.most_in_flight, Upstream.in_flight)
+        try:
+            time.sleep(DELAY)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+        except (BrokenPipeError, ConnectionResetError): pass
+        finally:
+            with Upstream.lock: Upstream.in_flight -= 1
+
+@pytest.fixture
+def upstream(monkeypatch):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(search, 'SEARCH_URL', f'http://127.0.0.1:{server.server_address[1]}/search')
+    Upstream.started, Upstream.in_flight, Upstream.most_in_flight = [], 0, 0
+    yield
+    server.shutdown()
+
+def test_pages_are_fetched_concurrently(upstream):
+    assert TOTAL_PAGES >= 10
+    started = time.monotonic()
+    found = asyncio.run(search.collect_search_results('x'))
+    elapsed = time.monotonic() - started
+    assert len(found) == TOTAL_PAGES * len(PAGE_RESULTS)
+    assert sorted(Upstream.started) == sorted(f'/search?keyword=x&page={page}' for page in range(1, TOTAL_PAGES + 1))
+    assert Upstream.most_in_flight == search.SEARCH_CONCURRENCY
+    assert elapsed < DELAY * TOTAL_PAGES # one page at a time, before any parsing
+
+def test_limit_cancels_the_remaining_pages(upstream):
+    found = asyncio.run(search.collect_search_results('x', limit=len(PAGE_RESULTS) + 1))
+    assert len(found) == len(PAGE_RESULTS) + 1
+    time.sleep(DELAY * 2) # anything not cancelled would have started by now
+    assert len(Upstream.started) <= 1 + 2 * search.SEARCH_CONCURRENCY < TOTAL_PAGES
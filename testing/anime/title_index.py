@@ -0,0 +1,144 @@
+import sqlite3, threading, unicodedata, bisect, heapq, json, re
+from collections import Counter
+from store import STORE_PATH
+from search import extract_search_results
+
+FUZZY_THRESHOLD = 0.4 # trigram jaccard a word needs to count as a typo of the query word
+QUICK_SEARCH_LIMIT = 10
+DOC_FIELDS = ["id", "title", "japanese_title", "poster", "duration", "tvInfo"]
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS titles (id TEXT PRIMARY KEY, title TEXT, japanese_title TEXT, synonyms TEXT, data TEXT NOT NULL);
+'''
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "").lower()
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r"[\W_]+", " ", text).split()
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TitleIndex:
+    # In-memory inverted index over title, japanese_title and synonyms of everything we've already scraped
+    # Rows live in the same SQLite file as AnimeStore and are upserted one at a time, the index is rebuilt from them on start
+    def __init__(self, path=STORE_PATH):
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.docs = {}
+        self.doc_words = {}
+        self.doc_titles = {}
+        self.postings = {}
+        self.vocab = []
+        self.word_trigrams = {}
+        for id, title, japanese_title, synonyms, data in self.db.execute("SELECT id, title, japanese_title, synonyms, data FROM titles"):
+            self.index(id, json.loads(data), title, japanese_title, synonyms)
+
+    def index(self, id, doc, title, japanese_title, synonyms):
+        self.unindex(id)
+        words = set(normalize(title) + normalize(japanese_title) + normalize(synonyms))
+        self.docs[id] = doc
+        self.doc_words[id] = words
+        self.doc_titles[id] = " ".join(normalize(title))
+        for word in words:
+            if word not in self.postings:
+                self.postings[word] = set()
+                bisect.insort(self.vocab, word)
+                for trigram in trigrams(word): self.word_trigrams.setdefault(trigram, set()).add(word)
+            self.postings[word].add(id)
+
+    def unindex(self, id):
+        for word in self.doc_words.pop(id, ()):
+            self.postings[word].discard(id)
+            if self.postings[word]: continue
+            del self.postings[word]
+            self.vocab.pop(bisect.bisect_left(self.vocab, word))
+            for trigram in trigrams(word): self.word_trigrams[trigram].discard(word)
+        self.docs.pop(id, None)
+        self.doc_titles.pop(id, None)
+
+    def upsert(self, result):
+        id = result.get("id")
+        if not id: return
+        doc = {field: result[field] for field in DOC_FIELDS if field in result}
+        if "showType" in result and "tvInfo" not in doc: doc["tvInfo"] = {"showType": result["showType"]}
+        synonyms = result.get("synonyms") or ""
+        if id in self.docs and synonyms == "": # a search result shouldn't wipe synonyms we got from the detail page
+            synonyms = self.db.execute("SELECT synonyms FROM titles WHERE id = ?", (id,)).fetchone()[0]
+        self.db.execute("INSERT OR REPLACE INTO titles VALUES (?, ?, ?, ?, ?)", (id, result.get("title"), result.get("japanese_title"), synonyms, json.dumps(doc)))
+        self.index(id, doc, result.get("title"), result.get("japanese_title"), synonyms)
+
+    def add(self, result):
+        # result is a search result or anime info dict, anime info brings its own synonyms
+        self.add_many([result])
+
+    def add_many(self, results):
+        # One transaction per batch, so a search page costs one commit
+        with self.lock, self.db:
+            self.db.execute("BEGIN")
+            for result in results: self.upsert(result)
+
+    def build_from_store(self, store):
+        # One-off backfill from AnimeStore rows
+        results = [json.loads(data) for (data,) in store.db.execute("SELECT data FROM anime")]
+        for (data,) in store.db.execute("SELECT data FROM search"): results += json.loads(data)
+        self.add_many(results)
+
+    def prefix_words(self, prefix):
+        start = bisect.bisect_left(self.vocab, prefix)
+        end = bisect.bisect_left(self.vocab, prefix + "\uffff")
+        return self.vocab[start:end]
+
+    def fuzzy_words(self, word):
+        query = trigrams(word)
+        shared = Counter(match for trigram in query for match in self.word_trigrams.get(trigram, ()))
+        return [match for match, count in shared.items() if count / (len(query) + len(trigrams(match)) - count) >= FUZZY_THRESHOLD]
+
+    def matches(self, word, last):
+        # Exact first, then prefix (only for the word still being typed), then typo-tolerant trigram matches
+        ids = set(self.postings.get(word, ()))
+        exact = set(ids)
+        if last:
+            for match in self.prefix_words(word): ids |= self.postings[match]
+        if not ids:
+            for match in self.fuzzy_words(word): ids |= self.postings[match]
+        return ids, exact
+
+    def query(self, term, limit=QUICK_SEARCH_LIMIT):
+        words = normalize(term)
+        if not words: return []
+        with self.lock:
+            found = None
+            exact_sets = []
+            for position, word in enumerate(words):
+                ids, exact = self.matches(word, position == len(words) - 1)
+                found = ids if found is None else found & ids
+                if not found: return []
+                exact_sets.append(exact)
+
+            # Most exactly matched words first, then titles starting with the query, then shorter titles
+            phrase = " ".join(words)
+            def rank(id):
+                title = self.doc_titles[id]
+                return (-sum(id in exact for exact in exact_sets), not title.startswith(phrase), len(title), id)
+            return [self.docs[id] for id in heapq.nsmallest(limit, found, key=rank)]
+
+    def stats(self):
+        return {"titles": len(self.docs), "words": len(self.postings), "trigrams": len(self.word_trigrams)}
+
+def quick_search(term, index, limit=QUICK_SEARCH_LIMIT):
+    # Local answer when the index has one, otherwise one upstream search page that then gets indexed
+    results = index.query(term, limit)
+    if results: return results
+    _, results = extract_search_results(term)
+    index.add_many(results)
+    return results[:limit]
+
+if __name__ == "__main__":
+    index = TitleIndex()
+    print(json.dumps(quick_search("horimiya", index), indent=2))
+    print(index.stats())
@@ -0,0 +1,141 @@
+import httpx, asyncio, time, json
+from provider import Provider, LIMITS, TIMEOUT, tmdb
+from probe import rank as rank_streams
+
+XPRIME_URL = "https://backend.xprime.tv"
+HEDGE_DELAY = 0.75 # head start the preferred provider gets before the next one is fired too
+EWMA_ALPHA = 0.3
+FAILURE_PENALTY = 10.0 # seconds a failed attempt counts as when ranking providers
+
+class ProviderStats:
+    # Moving average of how long each provider takes to hand back a working source, lowest goes first next time
+    def __init__(self):
+        self.latency = {}
+        self.counters = {}
+
+    def record(self, name, elapsed, outcome):
+        # A loser that got cancelled was at least `elapsed` slow, which is enough to push it behind the winner
+        sample = elapsed + FAILURE_PENALTY if outcome == "failures" else elapsed
+        previous = self.latency.get(name)
+        self.latency[name] = sample if previous is None else previous + EWMA_ALPHA * (sample - previous)
+        self.counters.setdefault(name, {"wins": 0, "failures": 0, "cancelled": 0})[outcome] += 1
+
+    def order(self, names):
+        # Providers we haven't measured yet go first so they get a chance to prove themselves
+        return sorted(names, key=lambda name: self.latency.get(name, 0))
+
+    def snapshot(self):
+        return {name: {"latency": round(self.latency.get(name, 0), 3), **counters} for name, counters in self.counters.items()}
+
+stats = ProviderStats()
+
+async def race(attempts, delay=0):
+    # attempts: (name, coroutine function) in preference order. Each one starts `delay` after the previous, or right away
+    # once everything running has failed. The first to return wins and the rest get cancelled
+    queue = list(attempts)
+    running = {}
+    next_start = 0
+    errors = []
+    try:
+        while queue or running:
+            now = time.perf_counter()
+            if queue and (not running or now >= next_start):
+                name, attempt = queue.pop(0)
+                running[asyncio.ensure_future(attempt())] = name
+                next_start = now + delay
+                continue
+
+            done, _ = await asyncio.wait(running, timeout=max(next_start - now, 0) if queue else None, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                running.pop(task)
+                if task.exception() is None: return task.result()
+                errors.append(task.exception())
+        raise LookupError(f"no working source ({len(errors)} attempts failed)")
+    finally:
+        for task in running: task.cancel()
+        if running: await asyncio.gather(*running, return_exceptions=True)
+
+def valid_source(source):
+    return isinstance(source, dict) and bool(source.get("link") or source.get("url") or source.get("streams"))
+
+class HedgedResolver:
+    def __init__(self, providers=("flixhq", "myflixerz"), xprime=(), hedge_delay=HEDGE_DELAY, client=None):
+        self.client = client or httpx.AsyncClient(limits=LIMITS, timeout=TIMEOUT, follow_redirects=True)
+        self.providers = {name: Provider.named(name, self.client) for name in providers}
+        self.xprime = list(xprime)
+        self.hedge_delay = hedge_delay
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def flix(self, name, tmdbid, type, season, episode, tmdb_data):
+        provider = self.providers[name]
+        _, servers = await provider.servers_for(tmdbid, type, season, episode, tmdb_data=tmdb_data)
+
+        def server_attempt(server_id, server_name):
+            async def attempt():
+                source = await provider.source(server_id)
+                if not valid_source(source): raise LookupError(f"{name}/{server_name} returned no source")
+                return {"provider": name, "server": server_name, "source": source}
+            return server_name, attempt
+
+        # Every listed server at once, whichever answers first with a link wins
+        return await race([server_attempt(server_id, server_name) for server_id, server_name in servers])
+
+    async def xprime_source(self, backend, tmdbid, type, season, episode, tmdb_data):
+        title = tmdb_data.get("name" if type == "tv" else "title", "")
+        date = tmdb_data.get("first_air_date" if type == "tv" else "release_date", "") or ""
+        params = {"name": title, "year": date.split("-")[0]}
+        if backend == "fox":
+            params["id"] = tmdbid
+            if tmdb_data.get("imdb_id"): params["imdb"] = tmdb_data["imdb_id"]
+        else: params["fallback_year"] = params["year"]
+        if type == "tv": params.update({"season": str(season), "episode": str(episode)})
+
+        response = await self.client.get(f"{XPRIME_URL}/{backend}", params=params)
+        source = response.json()
+        if not valid_source(source): raise LookupError(f"{backend} returned no source")
+        return {"provider": backend, "server": backend, "source": source}
+
+    def attempt(self, name, tmdbid, type, season, episode, tmdb_data, attempts):
+        async def run():
+            started = time.perf_counter()
+            attempts[name] = None
+            try:
+                if name in self.providers: return await self.flix(name, tmdbid, type, season, episode, tmdb_data)
+                return await self.xprime_source(name, tmdbid, type, season, episode, tmdb_data)
+            except Exception:
+                stats.record(name, time.perf_counter() - started, "failures")
+                attempts.pop(name)
+                raise
+            finally:
+                if name in attempts: attempts[name] = time.perf_counter() - started
+        return name, run
+
+    async def resolve(self, tmdbid, type, season=None, episode=None, probe=False):
+        started = time.perf_counter()
+        tmdb_data = await tmdb.aget(type, tmdbid, self.client)
+        names = stats.order(list(self.providers) + self.xprime)
+        attempts = {} # name -> seconds, for attempts that won or got cancelled
+        try:
+            result = await race([self.attempt(name, tmdbid, type, season, episode, tmdb_data, attempts) for name in names], self.hedge_delay)
+            winner = attempts.pop(result["provider"])
+            stats.record(result["provider"], winner, "wins")
+            # A cancelled loser would have finished no sooner than the winner, which is enough to rank it behind
+            for name, elapsed in attempts.items(): stats.record(name, max(elapsed, winner), "cancelled")
+        except LookupError:
+            result = {"provider": None, "server": None, "source": None}
+        # With probe every stream in the winning source gets measured, so the player starts on the fastest live one
+        if probe and result["source"]: result["streams"] = await rank_streams(result, self.client)
+        result["elapsed"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+async def resolve(tmdbid, type, season=None, episode=None, xprime=(), hedge_delay=HEDGE_DELAY, probe=False):
+    resolver = HedgedResolver(xprime=xprime, hedge_delay=hedge_delay)
+    try: return await resolver.resolve(tmdbid, type, season, episode, probe)
+    finally: await resolver.aclose()
+
+if __name__ == "__main__":
+    result = asyncio.run(resolve("40075", "tv", 1, 3, xprime=["fox", "primebox"], probe=True))
+    print(json.dumps(result, indent=2))
+    print(json.dumps(stats.snapshot(), indent=2))
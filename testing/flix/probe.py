@@ -0,0 +1,104 @@
+import httpx, asyncio, time, re
+from urllib.parse import urljoin, urlsplit
+
+PROBE_DEADLINE = 3.0 # a stream that can't show a playlist and some segment bytes in this long isn't worth playing
+SEGMENT_BYTES = 256 * 1024
+HOST_CACHE_TTL = 60
+PRIMEBOX_HEADERS = {"Referer": "https://pstream.mov/", "Origin": "https://pstream.mov"}
+BANDWIDTH_PATTERN = re.compile(r'BANDWIDTH=(\d+)')
+
+class HostCache:
+    # host -> the failed probe that showed it down, its other urls are skipped for a while instead of each timing out.
+    # Only dead hosts go in: one live url says nothing about another url on the same host
+    def __init__(self, ttl=HOST_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+
+    def get(self, host):
+        entry = self.entries.get(host)
+        if not entry or time.time() - entry[0] > self.ttl: return None
+        return entry[1]
+
+    def set(self, host, measurement):
+        self.entries[host] = (time.time(), measurement)
+        for stale in [host for host, entry in self.entries.items() if time.time() - entry[0] > self.ttl]: del self.entries[stale]
+
+host_cache = HostCache()
+
+def candidates(result):
+    # Every playable url in a hedged/xprime result ({"source": ...}), a Provider.resolve result ({"servers": [...]}) or a bare source
+    if "servers" in result:
+        return [candidate for server in result["servers"] if isinstance(server.get("source"), dict)
+                for candidate in candidates({"provider": result.get("provider"), "server": server["name"], "source": server["source"]})]
+    source = result.get("source", result) or {}
+    if not isinstance(source, dict): return []
+    provider, server = result.get("provider"), result.get("server")
+    if isinstance(source.get("streams"), dict):
+        return [{"provider": provider, "server": server, "quality": quality, "url": url, "headers": PRIMEBOX_HEADERS if provider == "primebox" else {}, "kind": "hls"}
+                for quality, url in source["streams"].items() if url]
+    url = source.get("url") or source.get("link")
+    kind = "iframe" if source.get("type") == "iframe" else "hls"
+    return [{"provider": provider, "server": server, "quality": None, "url": url, "headers": {}, "kind": kind}] if url else []
+
+def first_uri(playlist, base_url):
+    # The highest bandwidth variant of a master playlist, or the first segment of a media playlist
+    lines = [line.strip() for line in playlist.splitlines()]
+    variants = []
+    for number, line in enumerate(lines):
+        if not line.startswith("#EXT-X-STREAM-INF"): continue
+        uri = next((uri for uri in lines[number + 1:] if uri and not uri.startswith("#")), None)
+        bandwidth = BANDWIDTH_PATTERN.search(line)
+        if uri: variants.append((int(bandwidth.group(1)) if bandwidth else 0, uri))
+    if variants: return True, urljoin(base_url, max(variants, key=lambda variant: variant[0])[1])
+    return False, urljoin(base_url, next(line for line in lines if line and not line.startswith("#")))
+
+async def fetch_playlist(client, url, headers):
+    response = await client.get(url, headers=headers)
+    response.raise_for_status()
+    if not response.text.lstrip().startswith("#EXTM3U"): raise ValueError("not a playlist")
+    return response
+
+async def measure(client, url, headers):
+    started = time.perf_counter()
+    response = await fetch_playlist(client, url, headers)
+    ttfb = time.perf_counter() - started
+    is_master, uri = first_uri(response.text, str(response.url))
+    if is_master:
+        response = await fetch_playlist(client, uri, headers)
+        _, uri = first_uri(response.text, str(response.url))
+
+    # Throughput over the first bytes of the first segment, timed from when its response started
+    received = 0
+    async with client.stream("GET", uri, headers=headers) as segment:
+        segment.raise_for_status()
+        segment_started = time.perf_counter()
+        async for chunk in segment.aiter_bytes():
+            received += len(chunk)
+            if received >= SEGMENT_BYTES: break
+    elapsed = max(time.perf_counter() - segment_started, 1e-6)
+    if not received: raise ValueError("empty segment")
+    return {"alive": True, "ttfb": round(ttfb * 1000, 1), "throughput": round(received / elapsed)}
+
+async def probe(client, candidate, deadline=PROBE_DEADLINE):
+    try: measurement = await asyncio.wait_for(measure(client, candidate["url"], candidate["headers"]), deadline)
+    except Exception as e:
+        # A bad status or playlist is down to that one url, a host that times out or refuses is down for all of them
+        measurement = {"alive": False, "error": str(e) or type(e).__name__}
+        if isinstance(e, (httpx.TransportError, asyncio.TimeoutError)): host_cache.set(urlsplit(candidate["url"]).hostname, measurement)
+    return measurement
+
+async def rank(result, client=None, deadline=PROBE_DEADLINE):
+    # Probe every stream at once, drop the dead ones and return the rest fastest first (bytes/s, then time to first byte).
+    # Iframe embeds can't be probed like a playlist, they come after the streams in the order they were found
+    if client is None:
+        async with httpx.AsyncClient(timeout=deadline, follow_redirects=True) as client: return await rank(result, client, deadline)
+
+    found = candidates(result)
+    streams = [candidate for candidate in found if candidate["kind"] == "hls"]
+    iframes = [candidate for candidate in found if candidate["kind"] == "iframe"]
+    cached = [host_cache.get(urlsplit(candidate["url"]).hostname) for candidate in streams] # known-dead hosts, everything else is probed
+    fresh = [candidate for candidate, measurement in zip(streams, cached) if measurement is None]
+    probed = iter(await asyncio.gather(*[probe(client, candidate, deadline) for candidate in fresh]))
+    measured = [{**candidate, **(measurement if measurement is not None else next(probed))} for candidate, measurement in zip(streams, cached)]
+    alive = [candidate for candidate in measured if candidate["alive"]]
+    return sorted(alive, key=lambda candidate: (-candidate["throughput"], candidate["ttfb"])) + iframes
@@ -0,0 +1,199 @@
+import httpx, asyncio, time, json, sys, os
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tmdb import tmdb
+from id_map import id_map
+
+PROVIDERS = {
+    # flixhq and myflixerz run the same site, they only differ in host and the movie server id attribute
+    "flixhq": {"base_url": "https://flixhq.to", "movie_server_attr": "data-linkid"},
+    "myflixerz": {"base_url": "https://myflixerz.to", "movie_server_attr": "data-id"},
+}
+LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+TIMEOUT = 15
+
+class Timings(dict):
+    # stage -> milliseconds, so a slow resolve shows which hop ate the time
+    def stage(self, name):
+        return TimedStage(self, name)
+
+class TimedStage:
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    async def __aenter__(self):
+        self.start = time.perf_counter()
+
+    async def __aexit__(self, *exc):
+        self.timings[self.name] = round((time.perf_counter() - self.start) * 1000, 1)
+
+def match_search(html, type, title, release_year=None):
+    soup = BeautifulSoup(html, 'html.parser')
+    for item in soup.find_all('a', class_='nav-item'):
+        if 'nav-bottom' in item.get('class', []): continue
+        href = item.get('href', '')
+
+        film_name_elem = item.find('h3', class_='film-name')
+        if not film_name_elem: continue
+        film_name = film_name_elem.text.strip()
+
+        film_info = item.find('div', class_='film-infor')
+        if not film_info: continue
+        spans = film_info.find_all('span')
+
+        if type == "tv":
+            is_tv = any("TV" in span.text for span in spans)
+            if is_tv and title.lower() in film_name.lower(): return href.split('-')[-1]
+        else:
+            is_movie = any("Movie" in span.text for span in spans)
+            if is_movie and title.lower() in film_name.lower():
+                year_found = None
+                for span in spans:
+                    if span.text.isdigit() and len(span.text) == 4: year_found = span.text; break
+
+                if year_found == release_year: return href.split('-')[-1]
+    return None
+
+class Provider:
+    def __init__(self, name, base_url, movie_server_attr="data-id", client=None):
+        self.name = name
+        self.base_url = base_url
+        self.movie_server_attr = movie_server_attr
+        self.client = client or httpx.AsyncClient(limits=LIMITS, timeout=TIMEOUT, follow_redirects=True)
+
+    @classmethod
+    def named(cls, name, client=None):
+        return cls(name, client=client, **PROVIDERS[name])
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def get_soup(self, path):
+        response = await self.client.get(f"{self.base_url}{path}")
+        return BeautifulSoup(response.text, 'html.parser')
+
+    async def search(self, keyword):
+        response = await self.client.post(f"{self.base_url}/ajax/search", data={"keyword": keyword})
+        return response.text
+
+    async def seasons(self, id):
+        soup = await self.get_soup(f"/ajax/season/list/{id}")
+        return [(link.get('data-id'), link.text.strip()) for link in soup.find_all('a', class_='dropdown-item ss-item')]
+
+    async def episodes(self, season_id):
+        soup = await self.get_soup(f"/ajax/season/episodes/{season_id}")
+        return [(link.get('data-id'), link.get('title', '')) for link in soup.find_all('a', class_='nav-link btn btn-sm btn-secondary eps-item')]
+
+    async def servers(self, episode_id=None, movie_id=None):
+        # Episodes list their servers under episode/servers, movies under episode/list with a provider-specific id attribute
+        if movie_id: soup, attr = await self.get_soup(f"/ajax/episode/list/{movie_id}"), self.movie_server_attr
+        else: soup, attr = await self.get_soup(f"/ajax/episode/servers/{episode_id}"), 'data-id'
+        servers = []
+        for link in soup.find_all('a', class_='nav-link btn btn-sm btn-secondary link-item'):
+            name = link.find('span').text.strip() if link.find('span') else ''
+            servers.append((link.get(attr), name))
+        return servers
+
+    async def source(self, server_id):
+        response = await self.client.get(f"{self.base_url}/ajax/episode/sources/{server_id}")
+        try: return response.json()
+        except ValueError: return response.text
+
+    async def find_id(self, tmdbid, type, title=None, timings=None, tmdb_data=None):
+        # Search needs the title from TMDB, so with no title the two run back to back while the provider connection
+        # gets opened in parallel, with a known title the search itself overlaps the TMDB call
+        timings = timings if timings is not None else Timings()
+        if tmdb_data: title = tmdb_data.get("name" if type == "tv" else "title", "")
+
+        async def tmdb_record():
+            if tmdb_data: return tmdb_data
+            async with timings.stage("tmdb"): return await tmdb.aget(type, tmdbid, self.client)
+
+        async def search(keyword):
+            async with timings.stage("search"): return await self.search(keyword)
+
+        if title: tmdb_data, html = await asyncio.gather(tmdb_record(), search(title.lower()))
+        else: tmdb_data, _ = await asyncio.gather(tmdb_record(), self.warm())
+
+        tmdb_title = tmdb_data.get("name" if type == "tv" else "title", "")
+        if not title: html = await search(tmdb_title.lower())
+        release_date = tmdb_data.get("release_date", "")
+        release_year = release_date.split("-")[0] if release_date else ""
+        return match_search(html, type, tmdb_title or title, release_year), tmdb_data
+
+    async def warm(self):
+        # Gets DNS, TCP and TLS for the provider out of the way while TMDB answers
+        try: await self.client.head(self.base_url)
+        except httpx.HTTPError: pass
+
+    async def servers_from(self, id, tmdbid, type, season, episode, timings, season_id=None):
+        # (season_id, servers) once the provider id is known, with a mapped season_id the season list is skipped too.
+        # servers is None when the id (or season_id) lists nothing at all, [] when only this season or episode isn't there
+        if type != "tv":
+            async with timings.stage("servers"): return None, await self.servers(movie_id=id) or None
+
+        if not season_id:
+            async with timings.stage("seasons"): season_ids = await self.seasons(id)
+            # Every season's id comes with the list, so map them all while we're here
+            for number, (listed_id, _) in enumerate(season_ids, 1): id_map.put(self.name, type, tmdbid, id, number, listed_id)
+            if not season_ids: return None, None
+            if season > len(season_ids): return None, []
+            season_id = season_ids[season - 1][0]
+
+        async with timings.stage("episodes"): episode_ids = await self.episodes(season_id)
+        if not episode_ids: return season_id, None
+        if episode > len(episode_ids): return season_id, []
+        async with timings.stage("servers"): return season_id, await self.servers(episode_id=episode_ids[episode - 1][0])
+
+    async def servers_for(self, tmdbid, type, season=None, episode=None, title=None, timings=None, tmdb_data=None):
+        # (id, servers) for one title, servers is empty when the chain stops early
+        timings = timings if timings is not None else Timings()
+        mapped = id_map.get(self.name, type, tmdbid, season)
+        if mapped:
+            _, servers = await self.servers_from(mapped["id"], tmdbid, type, season, episode, timings, mapped["season_id"])
+            if servers is not None: return mapped["id"], servers # an episode past the end doesn't make the mapping wrong
+            id_map.forget(self.name, type, tmdbid, season) # the mapped id stopped listing anything, search again
+
+        id, _ = await self.find_id(tmdbid, type, title, timings, tmdb_data)
+        if not id: return id, []
+        season_id, servers = await self.servers_from(id, tmdbid, type, season, episode, timings)
+        if servers is not None: id_map.put(self.name, type, tmdbid, id, season, season_id)
+        return id, servers or []
+
+    async def map_title(self, type, tmdbid):
+        # For id_map.warm_trending: search once and map the title (and every season of a show) without resolving sources
+        id, _ = await self.find_id(tmdbid, type)
+        if not id: return
+        if type != "tv": return id_map.put(self.name, type, tmdbid, id)
+        for number, (season_id, _) in enumerate(await self.seasons(id), 1): id_map.put(self.name, type, tmdbid, id, number, season_id)
+
+    async def resolve(self, tmdbid, type, season=None, episode=None, source=None, title=None):
+        timings = Timings()
+        started = time.perf_counter()
+        result = {"provider": self.name, "id": None, "servers": [], "source": None, "timings": timings}
+        try:
+            result["id"], servers = await self.servers_for(tmdbid, type, season, episode, title, timings)
+
+            # Every server's sources at once instead of only the picked one
+            async with timings.stage("sources"):
+                sources = await asyncio.gather(*[self.source(server_id) for server_id, _ in servers], return_exceptions=True)
+
+            for (server_id, name), server_source in zip(servers, sources):
+                if isinstance(server_source, Exception): server_source = None
+                result["servers"].append({"id": server_id, "name": name, "source": server_source})
+                if name == source: result["source"] = server_source
+            return result
+        finally:
+            timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+
+async def resolve(provider, tmdbid, type, season=None, episode=None, source=None, title=None):
+    # One-shot helper, keep a Provider around instead to reuse its pooled connections across resolves
+    provider = Provider.named(provider)
+    try: return await provider.resolve(tmdbid, type, season, episode, source, title)
+    finally: await provider.aclose()
+
+if __name__ == "__main__":
+    result = asyncio.run(resolve("flixhq", "40075", "tv", 1, 3, "AKCloud"))
+    print(json.dumps(result, indent=2))
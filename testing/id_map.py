@@ -0,0 +1,70 @@
+import asyncio, sqlite3, threading, time, os
+from tmdb import tmdb
+
+ID_MAP_PATH = os.environ.get("ID_MAP_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "id_map.db"))
+WARM_CONCURRENCY = 4
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS id_map (
+    provider TEXT, type TEXT, tmdb_id TEXT, season INTEGER,
+    provider_id TEXT NOT NULL, season_id TEXT, mapped_at REAL, used_at REAL, hits INTEGER DEFAULT 0,
+    PRIMARY KEY (provider, type, tmdb_id, season)
+);
+'''
+
+class IdMap:
+    # TMDB id (+ season) -> a provider's own id and season id, filled on the first successful resolve
+    # Entries aren't checked up front: a caller that finds a mapped id no longer works calls forget() and searches again
+    def __init__(self, path=ID_MAP_PATH):
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "forgotten": 0}
+
+    def get(self, provider, type, tmdb_id, season=None):
+        with self.lock:
+            row = self.db.execute("SELECT provider_id, season_id FROM id_map WHERE provider = ? AND type = ? AND tmdb_id = ? AND season = ?",
+                                  (provider, type, str(tmdb_id), season or 0)).fetchone()
+            if not row:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            self.db.execute("UPDATE id_map SET used_at = ?, hits = hits + 1 WHERE provider = ? AND type = ? AND tmdb_id = ? AND season = ?",
+                            (time.time(), provider, type, str(tmdb_id), season or 0))
+            return {"id": row[0], "season_id": row[1]}
+
+    def put(self, provider, type, tmdb_id, provider_id, season=None, season_id=None):
+        if not provider_id: return
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO id_map (provider, type, tmdb_id, season, provider_id, season_id, mapped_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (provider, type, str(tmdb_id), season or 0, str(provider_id), season_id, now, now))
+
+    def forget(self, provider, type, tmdb_id, season=None):
+        with self.lock:
+            self.counters["forgotten"] += 1
+            self.db.execute("DELETE FROM id_map WHERE provider = ? AND type = ? AND tmdb_id = ? AND season = ?", (provider, type, str(tmdb_id), season or 0))
+
+    def stats(self):
+        with self.lock: count = self.db.execute("SELECT COUNT(*) FROM id_map").fetchone()[0]
+        return {"mappings": count, **self.counters}
+
+id_map = IdMap()
+
+async def warm_trending(map_title, type="tv", pages=1, concurrency=WARM_CONCURRENCY):
+    # Background job: map_title(type, tmdb_id) resolves and stores one title, run it over TMDB's trending list
+    # so the first play of a popular title already skips the search
+    ids = []
+    for page in range(1, pages + 1):
+        trending = await tmdb.afetch(f"trending/{type}/week?page={page}")
+        ids += [str(item["id"]) for item in trending.get("results", [])]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    async def warm(tmdb_id):
+        async with semaphore:
+            try: await map_title(type, tmdb_id)
+            except Exception as e: print(f"Error warming {type}/{tmdb_id}: {e}")
+
+    await asyncio.gather(*[warm(tmdb_id) for tmdb_id in ids])
+    return len(ids)
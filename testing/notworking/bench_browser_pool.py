@@ -0,0 +1,85 @@
+import argparse, asyncio, json, os, sys, threading, time, http.server
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from playwright.async_api import async_playwright
+from browser_pool import BrowserPool, LAUNCH_ARGS, BROWSER_PATH, HEADLESS, USER_AGENT, block_resources
+
+# Per-lookup time of a browser launched for every lookup (what the scrapers did before) against one BrowserPool, over
+# a local page shaped like a provider's embed: it loads a stylesheet and an image and POSTs for its server list.
+# Needs chromium (playwright install chromium, or BROWSER_PATH). Run with: python bench_browser_pool.py [--lookups 8]
+
+PAGE = b"""<html><head><link rel="stylesheet" href="/style.css"></head><body><img src="/poster.png">
+<script>fetch('/abcYDGUTEY/list', {method: 'POST'}).then(response => response.text());</script></body></html>"""
+SERVERS = json.dumps([{"name": "Alpha", "data": "x"}]).encode()
+
+class Fixture(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args): pass
+
+    def reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self): self.reply(PAGE if self.path.startswith('/movie/') else b'', 'text/html')
+
+    def do_POST(self): self.reply(SERVERS, 'application/json')
+
+async def lookup(page, url):
+    # What a scraper does with a page: open the embed and wait for its server list
+    servers = asyncio.get_running_loop().create_future()
+    async def on_response(response):
+        if 'YDGUTEY' in response.url and response.request.method == 'POST' and not servers.done(): servers.set_result(await response.text())
+    page.on("response", on_response)
+    await page.goto(url, wait_until='domcontentloaded')
+    return json.loads(await asyncio.wait_for(servers, 10))
+
+async def cold(url):
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=HEADLESS, args=LAUNCH_ARGS, executable_path=BROWSER_PATH)
+        try:
+            context = await browser.new_context(user_agent=USER_AGENT)
+            await context.route("**/*", block_resources)
+            return await lookup(await context.new_page(), url)
+        finally: await browser.close()
+
+async def warm(pool, url):
+    async with pool.page() as page: return await lookup(page, url)
+
+async def timed(lookups):
+    started = time.perf_counter()
+    for make in lookups:
+        if (await make())[0]['name'] != 'Alpha': raise RuntimeError('wrong server list')
+    return (time.perf_counter() - started) / len(lookups) * 1000
+
+async def run(url, lookups, concurrent):
+    pool = BrowserPool()
+    try:
+        rows = [('cold', await timed([lambda: cold(url)] * lookups)),
+                ('pool first', await timed([lambda: warm(pool, url)])),
+                ('pool warm', await timed([lambda: warm(pool, url)] * lookups))]
+        started = time.perf_counter()
+        await asyncio.gather(*[warm(pool, url) for _ in range(concurrent)])
+        rows.append((f'pool {concurrent} at once', (time.perf_counter() - started) * 1000))
+        return rows, pool.stats()
+    finally: await pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Lookup time with a browser per lookup against the shared BrowserPool')
+    parser.add_argument('--lookups', type=int, default=8)
+    parser.add_argument('--concurrent', type=int, default=12)
+    args = parser.parse_args()
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Fixture)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    rows, stats = asyncio.run(run(f'http://127.0.0.1:{server.server_address[1]}/movie/123', args.lookups, args.concurrent))
+    server.shutdown()
+
+    print(f'ms per lookup over {args.lookups} lookups, the at-once row is the wall time for all of them')
+    print(f'{"mode":<20}{"ms":>10}')
+    for mode, ms in rows: print(f'{mode:<20}{ms:>10.0f}')
+    print(f'pool: {stats}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+from playwright.async_api import async_playwright
+import asyncio, contextlib, os
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
+LAUNCH_ARGS = ['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu']
+BLOCKED_RESOURCES = ["image", "stylesheet", "font", "media", "websocket", "eventsource", "manifest", "other"]
+HEADLESS = os.environ.get("BROWSER_HEADLESS", "1") != "0"
+BROWSER_PATH = os.environ.get("BROWSER_PATH") # a local chrome instead of playwright's own download
+CONTEXTS = 2
+PAGES = 4 # open pages across all contexts, more lookups than this wait their turn
+CONTEXT_MAX_USES = 50
+CONTEXT_MAX_HEAP = 256 * 1024 * 1024 # JS heap a page may leave behind before its context gets replaced
+
+async def block_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCES: await route.abort()
+    else: await route.continue_()
+
+class PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.uses = 0
+        self.active = 0
+        self.retired = False
+
+class BrowserPool:
+    # One browser kept alive between lookups, so a lookup only pays for navigation and not the ~2s chromium startup.
+    # Pages are spread over a few contexts, a context gets swapped for a fresh one after CONTEXT_MAX_USES pages
+    # or once a page's JS heap grows past CONTEXT_MAX_HEAP
+    def __init__(self, contexts=CONTEXTS, pages=PAGES, max_uses=CONTEXT_MAX_USES, max_heap=CONTEXT_MAX_HEAP, headless=HEADLESS):
+        self.size = contexts
+        self.pages = pages
+        self.max_uses = max_uses
+        self.max_heap = max_heap
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        self.loop = None
+        self.contexts = []
+        self.counters = {"launches": 0, "pages": 0, "recycled": 0}
+
+    async def start(self):
+        # The browser belongs to one event loop, a new asyncio.run launches a new one
+        loop = asyncio.get_running_loop()
+        if self.loop is loop and self.browser and self.browser.is_connected(): return
+        if self.loop is not loop:
+            self.loop = loop
+            self.playwright = self.browser = None
+            self.lock = asyncio.Lock()
+            self.semaphore = asyncio.Semaphore(self.pages)
+        async with self.lock:
+            if self.browser and self.browser.is_connected(): return
+            if self.playwright is None: self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS, executable_path=BROWSER_PATH)
+            self.contexts = []
+            self.counters["launches"] += 1
+
+    async def new_context(self):
+        context = await self.browser.new_context(user_agent=USER_AGENT, extra_http_headers={'Accept-Language': 'en-US,en;q=0.9'})
+        await context.route("**/*", block_resources)
+        pooled = PooledContext(context)
+        self.contexts.append(pooled)
+        return pooled
+
+    async def pick_context(self):
+        live = [pooled for pooled in self.contexts if not pooled.retired]
+        if len(live) < self.size: return await self.new_context()
+        return min(live, key=lambda pooled: pooled.active)
+
+    async def heap_size(self, page):
+        try:
+            session = await page.context.new_cdp_session(page)
+            await session.send("Performance.enable")
+            metrics = await session.send("Performance.getMetrics")
+            await session.detach()
+            return next((metric["value"] for metric in metrics["metrics"] if metric["name"] == "JSHeapUsedSize"), 0)
+        except Exception: return 0
+
+    async def release(self, pooled, page):
+        pooled.uses += 1
+        if not pooled.retired and (pooled.uses >= self.max_uses or await self.heap_size(page) > self.max_heap):
+            pooled.retired = True
+            self.counters["recycled"] += 1
+        await page.close()
+        pooled.active -= 1
+        # A retired context is closed once its last page is done, the next lookup opens a fresh one in its place
+        if pooled.retired and not pooled.active:
+            if pooled in self.contexts: self.contexts.remove(pooled)
+            await pooled.context.close()
+
+    @contextlib.asynccontextmanager
+    async def page(self, cookies=None):
+        await self.start()
+        async with self.semaphore:
+            async with self.lock: pooled = await self.pick_context()
+            pooled.active += 1
+            try:
+                if cookies: await pooled.context.add_cookies(cookies)
+                page = await pooled.context.new_page()
+            except Exception:
+                pooled.active -= 1
+                raise
+            self.counters["pages"] += 1
+            try: yield page
+            finally: await self.release(pooled, page)
+
+    async def close(self):
+        if self.browser: await self.browser.close()
+        if self.playwright: await self.playwright.stop()
+        self.browser = self.playwright = self.loop = None
+        self.contexts = []
+
+    def stats(self):
+        return {"contexts": len(self.contexts), **self.counters}
+
+pool = BrowserPool()
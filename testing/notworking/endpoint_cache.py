@@ -0,0 +1,151 @@
+import httpx, sqlite3, threading, json, time, re, os
+from urllib.parse import urlsplit, unquote, unquote_plus, quote
+
+ENDPOINT_CACHE_PATH = os.environ.get("ENDPOINT_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "endpoints.db"))
+DEFAULT_LIFETIME = 6 * 60 * 60 # until a replay has failed once we don't know how long a capture stays good
+MIN_LIFETIME = 60 # never stop trying replays entirely, the site may have gone back to long-lived tokens
+LIFETIME_MARGIN = 0.8 # replay up to this share of the observed lifetime, then capture fresh
+LIFETIME_ALPHA = 0.5
+SKIPPED_HEADERS = {"host", "content-length", "accept-encoding", "connection", "cookie"}
+TIMEOUT = 10
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS endpoints (
+    provider TEXT PRIMARY KEY, endpoint TEXT NOT NULL, learned_at REAL, expires_at REAL, lifetime REAL
+);
+'''
+
+def placeholder(name): return "{" + name + "}"
+
+def template_pairs(text, params, placed):
+    # key=value pairs whose key is a param's name and whose value is that param's value
+    pairs = []
+    for pair in text.split("&"):
+        key, sep, value = pair.partition("=")
+        name = unquote_plus(key)
+        if sep and name in params and unquote_plus(value) == str(params[name]):
+            pairs.append(f"{key}={placeholder(name)}")
+            placed.add(name)
+        else: pairs.append(pair)
+    return "&".join(pairs)
+
+def template(endpoint, params):
+    # The title's own values in the captured call become {name} so one capture serves other titles too. Only whole path
+    # segments equal to a param's value and query/form values under the param's own name are used. A capture where two
+    # params share a value, a value shows up in more than one path segment or a param can't be placed at all gives None:
+    # replaying it for another title could quietly ask for the wrong one
+    values = [str(value) for value in params.values()]
+    if len(set(values)) < len(values): return None
+    parts = urlsplit(endpoint["url"].replace("{", "%7B").replace("}", "%7D"))
+    names = {str(value): name for name, value in params.items()}
+    placed = set()
+    segments = []
+    for segment in parts.path.split("/"):
+        name = names.get(unquote(segment))
+        if name in placed: return None
+        if name: placed.add(name)
+        segments.append(placeholder(name) if name else segment)
+    query = template_pairs(parts.query, params, placed) if parts.query else ""
+    data = endpoint.get("data")
+    if data:
+        data = data.replace("{", "%7B").replace("}", "%7D")
+        if "=" in data: data = template_pairs(data, params, placed)
+        elif any(re.search(rf'(?<![A-Za-z0-9]){re.escape(value)}(?![A-Za-z0-9])', data) for value in values): return None
+    if placed != set(params): return None
+    url = parts._replace(path="/".join(segments), query=query).geturl()
+    return {**endpoint, "url": url, "data": data or None, "params": sorted(params)}
+
+def fill(text, params):
+    return re.sub(r'\{(\w+)\}', lambda match: quote(str(params[match.group(1)]), safe="") if match.group(1) in params else match.group(), text)
+
+def normalized(url):
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc, [unquote(segment) for segment in parts.path.split("/")], sorted(unquote_plus(pair) for pair in parts.query.split("&") if pair)
+
+def matches(url, endpoint, params):
+    # The url a replay ended up at (after redirects) is the learned call with the requested id/season/episode in it
+    return normalized(url) == normalized(fill(endpoint["url"], params))
+
+async def capture_request(request, page):
+    # What a replay needs from a request the browser made: url, method, body, headers and the host's cookies
+    headers = {name: value for name, value in (await request.all_headers()).items() if not name.startswith(":") and name not in SKIPPED_HEADERS}
+    host = urlsplit(request.url).hostname or ""
+    cookies = [cookie for cookie in await page.context.cookies() if host.endswith(cookie["domain"].lstrip("."))]
+    return {"url": request.url, "method": request.method, "data": request.post_data, "headers": headers,
+            "cookies": {cookie["name"]: cookie["value"] for cookie in cookies},
+            "cookie_expires": min([cookie["expires"] for cookie in cookies if cookie.get("expires", -1) > 0], default=None)}
+
+class EndpointCache:
+    # provider -> the API call its embed page makes, captured once in a browser and replayed over plain HTTP after that.
+    # A replay that fails validation means the capture went stale: how long it lasted becomes the lifetime for the next one
+    def __init__(self, path=ENDPOINT_CACHE_PATH):
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "fallbacks": 0, "untemplatable": 0}
+
+    def get(self, provider):
+        with self.lock: row = self.db.execute("SELECT endpoint, expires_at FROM endpoints WHERE provider = ?", (provider,)).fetchone()
+        if not row or row[1] <= time.time(): return None
+        return json.loads(row[0])
+
+    def learn(self, provider, endpoint, params):
+        now = time.time()
+        endpoint = template(endpoint, params)
+        if endpoint is None:
+            # Not safe to replay for other titles, the next lookup goes to the browser again
+            self.counters["untemplatable"] += 1
+            return
+        with self.lock:
+            row = self.db.execute("SELECT lifetime FROM endpoints WHERE provider = ?", (provider,)).fetchone()
+            lifetime = row[0] if row and row[0] else None
+            expires_at = now + (lifetime * LIFETIME_MARGIN if lifetime else DEFAULT_LIFETIME)
+            if endpoint.get("cookie_expires"): expires_at = min(expires_at, endpoint["cookie_expires"])
+            self.db.execute("INSERT OR REPLACE INTO endpoints VALUES (?, ?, ?, ?, ?)", (provider, json.dumps(endpoint), now, max(expires_at, now + MIN_LIFETIME), lifetime))
+
+    def fail(self, provider):
+        # Keep the row for its lifetime, only the endpoint stops being handed out
+        with self.lock:
+            row = self.db.execute("SELECT learned_at, lifetime FROM endpoints WHERE provider = ?", (provider,)).fetchone()
+            if not row: return
+            observed = max(time.time() - row[0], MIN_LIFETIME)
+            lifetime = observed if not row[1] else row[1] + LIFETIME_ALPHA * (observed - row[1])
+            self.db.execute("UPDATE endpoints SET expires_at = 0, lifetime = ? WHERE provider = ?", (lifetime, provider))
+
+    async def replay(self, endpoint, params, client=None):
+        if client is None:
+            async with httpx.AsyncClient(timeout=TIMEOUT, follow_redirects=True) as client: return await self.replay(endpoint, params, client)
+        response = await client.request(endpoint["method"], fill(endpoint["url"], params), headers=endpoint["headers"], cookies=endpoint["cookies"],
+                                        content=fill(endpoint["data"], params) if endpoint.get("data") else None)
+        response.raise_for_status()
+        return response
+
+    async def lookup(self, provider, params, capture, parse, client=None):
+        # parse(response text, url) -> result or None when it isn't what we wanted,
+        # capture() -> (endpoint, text) from the browser, only run when there's nothing usable to replay
+        endpoint = self.get(provider)
+        if endpoint and endpoint.get("params") != sorted(params): endpoint = None # learned for a differently shaped lookup
+        if endpoint:
+            try:
+                response = await self.replay(endpoint, params, client)
+                result = parse(response.text, str(response.url)) if matches(str(response.url), endpoint, params) else None
+            except Exception: result = None
+            if result is not None:
+                self.counters["hits"] += 1
+                return result
+            self.counters["fallbacks"] += 1
+            self.fail(provider)
+        else: self.counters["misses"] += 1
+
+        endpoint, text = await capture()
+        if endpoint is None: return None
+        result = parse(text, endpoint["url"])
+        if result is not None: self.learn(provider, endpoint, params)
+        return result
+
+    def stats(self):
+        with self.lock: count = self.db.execute("SELECT COUNT(*) FROM endpoints WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        return {"endpoints": count, **self.counters}
+
+endpoints = EndpointCache()
@@ -1,41 +1,41 @@
-from playwright.async_api import async_playwright
 import asyncio, json, requests
+from browser_pool import pool
+from endpoint_cache import endpoints, capture_request
 
-async def get_data():
+def parse_sources(text, url):
+    # The source list plus the prefix get_source posts to, taken from the list's own url
+    try: sources = json.loads(text)
+    except ValueError: return None
+    if not isinstance(sources, list) or not sources: return None
+    return sources, f"{url.split('YDGUTEY')[0]}xo8XtbY-sVen/"
+
+async def capture(id):
+    endpoint = None
     sources = None
-    starter = None
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu'])
-        context = await browser.new_context(user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36", extra_http_headers={'Accept-Language': 'en-US,en;q=0.9'})
-        page = await context.new_page()
+    async with pool.page() as page:
+        data_received = asyncio.Event()
+        
+        async def handle_response(response):
+            nonlocal endpoint, sources
+            if 'YDGUTEY' in response.url and response.request.method == 'POST':
+                try:
+                    sources = await response.text()
+                    endpoint = await capture_request(response.request, page)
+                    data_received.set()
+                except Exception as e:
+                    print(f"Error processing response: {e}")
 
-        await page.route("**/*", lambda route: route.abort() if route.request.resource_type in [
-            "image", "stylesheet", "font", "media", "websocket", "eventsource", "manifest", "other"
-        ] else route.continue_())
+        page.on("response", handle_response)
+        
+        await page.goto(f"https://vidfast.pro/movie/{id}?autoPlay=false", wait_until='domcontentloaded')
         
-        try:
-            data_received = asyncio.Event()
-            
-            async def handle_response(response):
-                nonlocal sources, starter
-                if 'YDGUTEY' in response.url and response.request.method == 'POST':
-                    try:
-                        sources = await response.text()
-                        url_parts = response.url.split('YDGUTEY')
-                        starter = f'{url_parts[0]}xo8XtbY-sVen/'
-                        data_received.set()
-                    except Exception as e:
-                        print(f"Error processing response: {e}")
+        await asyncio.wait_for(data_received.wait(), timeout=5.0)
+        
+        return endpoint, sources
 
-            page.on("response", handle_response)
-            
-            await page.goto(f"https://vidfast.pro/movie/123?autoPlay=false", wait_until='domcontentloaded')
-            
-            await asyncio.wait_for(data_received.wait(), timeout=5.0)
-            
-            if sources: return json.loads(sources), starter
-            
-        finally: await browser.close()
+async def get_data(id=123):
+    # The browser only runs when there's no captured YDGUTEY call to replay or the replay stopped working
+    return await endpoints.lookup("vidfast", {"id": id}, lambda: capture(id), parse_sources)
 
 def get_source(sources, source_name, starter):
     for source in sources:
@@ -49,9 +49,15 @@ def get_source(sources, source_name, starter):
                 return None
     return None
 
+async def main():
+    try: return await get_data()
+    finally:
+        await pool.close()
+        print(endpoints.stats())
+
 if __name__ == "__main__":
     try:
-        sources, starter = asyncio.run(get_data())
+        sources, starter = asyncio.run(main())
         print(sources, '\n')
         print(starter, '\n')
         
@@ -61,4 +67,4 @@ if __name__ == "__main__":
         
     except Exception as e: print(f"Error: {e}")
 
-# LOWEST TIME: 2.2s
\ No newline at end of file
+# LOWEST TIME: 2.2s cold, most of it browser startup that the pool pays once per process
\ No newline at end of file
@@ -1,39 +1,60 @@
-from playwright.async_api import async_playwright
 import asyncio, json, requests
+from browser_pool import pool
+from endpoint_cache import endpoints, capture_request
 
-async def test(type, id, season=0, episode=0):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page() 
-        response_data = None
+def parse_servers(text, url):
+    try: servers = json.loads(text)
+    except ValueError: return None
+    return servers if isinstance(servers, dict) and servers.get('data') else None
+
+async def capture(type, id, season=0, episode=0):
+    async with pool.page() as page:
+        endpoint = None
+        response_text = None
+        received = asyncio.Event()
         
         async def handle_request(request):
-            nonlocal response_data
+            nonlocal endpoint, response_text
             if "https://vidsrc.cc/api/" in request.url and "/servers?type=" in request.url:
                 response = await request.response()
-                if response: response_data = await response.json()
+                if response:
+                    response_text = await response.text()
+                    endpoint = await capture_request(request, page)
+                    received.set()
                 
         page.on("request", handle_request)
         if type == 'movie': url = f"https://vidsrc.cc/v3/embed/movie/{id}?autoPlay=true"
         else: url = f"https://vidsrc.cc/v2/embed/tv/{id}/{season}/{episode}?autoPlay=true"
         await page.goto(url)
-        while not response_data: await asyncio.sleep(1)
-            
-        await browser.close()
-        return response_data
+        # Bounded so a page that never makes the call gives its pool slot back
+        try: await asyncio.wait_for(received.wait(), timeout=15.0)
+        except asyncio.TimeoutError: return None, None
+        return endpoint, response_text
+
+async def test(type, id, season=0, episode=0):
+    # Movies and shows call differently shaped urls, so each gets its own captured endpoint
+    params = {"id": id} if type == 'movie' else {"id": id, "season": season, "episode": episode}
+    return await endpoints.lookup(f"vidsrcCC/{type}", params, lambda: capture(type, id, season, episode), parse_servers)
+
+async def main():
+    try: return await test('tv', 40075, 1, 3)
+    finally:
+        await pool.close()
+        print(endpoints.stats())
 
-sources = asyncio.run(test('tv', 40075))
-print(sources)
+if __name__ == "__main__":
+    sources = asyncio.run(main())
+    print(sources)
 
-if sources and 'data' in sources:
-    for source in sources['data']:
-        if 'hash' in source:
-            response = requests.get(
-                f"https://vidsrc.cc/api/source/{source['hash']}?opensubtiles=true", 
-                headers={
-                    'Origin': 'https://vidsrc.cc',
-                    'Referer': 'https://vidsrc.cc',
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                }
-            )
-            print(response.text)
+    if sources and 'data' in sources:
+        for source in sources['data']:
+            if 'hash' in source:
+                response = requests.get(
+                    f"https://vidsrc.cc/api/source/{source['hash']}?opensubtiles=true", 
+                    headers={
+                        'Origin': 'https://vidsrc.cc',
+                        'Referer': 'https://vidsrc.cc',
+                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+                    }
+                )
+                print(response.text)
\ No newline at end of file
@@ -0,0 +1,96 @@
+import os, sys, re, random, time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("TMDB_CACHE", ":memory:") # vegamovies pulls in the shared TMDB client and id map, keep their caches off disk
+os.environ.setdefault("ID_MAP_PATH", ":memory:")
+from vegamovies import extract_quality_tags, extract_quality_tags_batch
+
+# Golden outputs: extract_quality_tags must keep returning exactly what the old per-tag version did
+def legacy_extract_quality_tags(title):
+    quality_tags = ['PREHD', 'PRE-HD', 'WEB-DL', 'HDTS', 'HDR', 'BDRip', 'Dual Audio', 'BluRay']
+    found_tags = []
+    cleaned_title = title
+
+    hindi_combo_pattern = re.compile(r'\(Hindi\s*[-–]\s*([^)]+)\)', re.IGNORECASE)
+    hindi_combo_match = hindi_combo_pattern.search(cleaned_title)
+    if hindi_combo_match:
+        found_tags.append(f'Hindi - {hindi_combo_match.group(1).strip()}')
+        cleaned_title = hindi_combo_pattern.sub('', cleaned_title)
+    elif re.search(r'\bHindi\b', cleaned_title, re.IGNORECASE):
+        found_tags.append('Hindi')
+        cleaned_title = re.sub(r'\bHindi\b', '', cleaned_title, flags=re.IGNORECASE)
+
+    cleaned_title = re.sub(r'\(\s*[-–]\s*[^)]*\)', '', cleaned_title)
+    cleaned_title = re.sub(r'\(\s*\)', '', cleaned_title)
+
+    for tag in quality_tags:
+        pattern = re.compile(re.escape(tag), re.IGNORECASE)
+        if pattern.search(cleaned_title):
+            found_tags.append(tag)
+            cleaned_title = pattern.sub('', cleaned_title)
+
+    cleaned_title = re.sub(r'(?:1080p|720p|480p)(?:\s*[-–]\s*(?:1080p|720p|480p))*', '', cleaned_title, flags=re.IGNORECASE)
+    cleaned_title = re.sub(r'\s+', ' ', cleaned_title).strip()
+
+    return cleaned_title, found_tags
+
+RELEASE_TITLES = [
+    "Download Superman (2025) WEB-DL Dual Audio {Hindi-English} 480p [450MB] | 720p [1.2GB] | 1080p [2.6GB]",
+    "Download Jurassic World Rebirth (2025) (Hindi - English) HDTS 480p 720p 1080p",
+    "Download F1 (2025) PRE-HD [Hindi (LiNE) + English] 1080p",
+    "Download Thunderbolts* (2025) BluRay Dual Audio (Hindi-English) 480p [500MB] || 720p [1.4GB] || 1080p [3.2GB]",
+    "Download Sinners (2025) WEB-DL HDR 2160p 4K (Hindi - English - Tamil) ",
+    "Download Mission: Impossible – The Final Reckoning (2025) PREHD Hindi 720p",
+    "Download The Accountant 2 (2025) BDRip Dual Audio 480p-720p-1080p",
+    "Download Stree 2 (2024) Hindi WEB-DL 1080p – 720p – 480p",
+    "Download Pushpa 2: The Rule (2024) (Hindi – Telugu) HDTS 1080p",
+    "Download Lilo & Stitch (2025) ( - ) WEB-DL ()  720p",
+    "Download Hindi Medium (2017) BluRay 1080p",
+    "Download Ballerina (2025) hdr web-dl dual audio 1080P",
+    "Download How to Train Your Dragon (2025) HDTC (Hindi-DD5.1) 720p",
+    "Download Elio (2025) web-dlrip bluray-rip BDRIP 480p",
+    "Download Sitaare Zameen Par (2025) Hindi PRE-HDRip 1080p",
+    "Download  The   Old Guard 2 (2025)   Dual   Audio   720p  ",
+    "Download Inside Out 2 (2024) {HINDI-ENGLISH} HDRip 480p 720p",
+    "Download Deva (2025) (Hindi -) WEB-DL",
+    "Download Chhaava (2025) Hindi (- Marathi) 720p",
+]
+
+# Tags sharing characters or glued together once one is removed, where removing every match at once would differ
+TRICKY_TITLES = ["x BDRIPREHD", "BDRipre-HD x", "HDPREHDR", "PRE-HDTS", "WEB-DLPREHDR", "BluRayHDTSDual Audio", "pREhdts hdR"]
+
+FRAGMENTS = ['PREHD', 'PRE-HD', 'PRE', 'HD', 'HDTS', 'TS', 'HDR', 'R', 'BDRip', 'BD', 'Rip', 'ripre', 'Dual Audio', 'Dual', 'Audio',
+             'BluRay', 'Blu', 'Ray', 'WEB-DL', 'WEB', '-DL', 'DL', 'web-dl', 'hdr', '(Hindi - English)', '(Hindi – Tamil)', 'Hindi',
+             '(', ')', ' - ', '–', ' ', '1080p', '720p', '480p', 'p', 'The Film', '(2025)']
+
+def fuzz_titles(count, seed=7):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 10))) for _ in range(count)]
+
+def test_release_titles_match_legacy():
+    for title in RELEASE_TITLES: assert extract_quality_tags(title) == legacy_extract_quality_tags(title), title
+
+def test_overlapping_tags_match_legacy():
+    for title in TRICKY_TITLES: assert extract_quality_tags(title) == legacy_extract_quality_tags(title), title
+    assert extract_quality_tags("x BDRIPREHD") == ("x BDRI", ["PREHD"])
+
+def test_fuzzed_titles_match_legacy():
+    for title in fuzz_titles(20000): assert extract_quality_tags(title) == legacy_extract_quality_tags(title), title
+
+def test_batch_matches_single_calls():
+    titles = RELEASE_TITLES * 3 + TRICKY_TITLES
+    results = extract_quality_tags_batch(titles)
+    assert results == [extract_quality_tags(title) for title in titles]
+    results[0][1].append("mutated") # repeats get their own lists
+    assert "mutated" not in results[len(RELEASE_TITLES)][1]
+
+if __name__ == "__main__":
+    # Throughput benchmark: python testing/test_vegamovies.py
+    titles = [f"{title} #{number}" for number, title in enumerate(RELEASE_TITLES * 2500)]
+    for name, extract in [("legacy", legacy_extract_quality_tags), ("compiled", extract_quality_tags)]:
+        started = time.perf_counter()
+        for title in titles: extract(title)
+        print(f"{name}: {len(titles) / (time.perf_counter() - started):.0f} titles/s")
+    repeated = RELEASE_TITLES * 2500
+    started = time.perf_counter()
+    extract_quality_tags_batch(repeated)
+    print(f"batch (repeated titles): {len(repeated) / (time.perf_counter() - started):.0f} titles/s")
@@ -0,0 +1,162 @@
+import requests, httpx, asyncio, sqlite3, threading, json, time, os
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+
+TMDB_URL = "https://api.themoviedb.org/3"
+TMDB_API_KEY = "8265bd1679663a7ea12ac168da84d2e8"
+CACHE_PATH = os.environ.get("TMDB_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmdb.db"))
+CACHE_SIZE = 2000
+CACHE_TTLS = {"movie": 7 * 24 * 60 * 60, "tv": 24 * 60 * 60, "season": 12 * 60 * 60, "trending": 6 * 60 * 60}
+APPEND_MAX = 20 # TMDB caps append_to_response at 20 sub-requests
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tmdb (key TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL);
+'''
+
+def ttl_for(key):
+    return CACHE_TTLS["season"] if "/season/" in key else CACHE_TTLS.get(key.split("/")[0], CACHE_TTLS["tv"])
+
+class TMDBClient:
+    # One TMDB client for every provider: pooled connections, an in-memory LRU over a SQLite TTL cache,
+    # and concurrent lookups of the same record share one request
+    def __init__(self, path=CACHE_PATH, size=CACHE_SIZE):
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.sync_flights = {}
+        self.async_flights = {}
+        self.async_client = None
+        self.async_loop = None
+        self.counters = {"memory": 0, "disk": 0, "fetched": 0, "coalesced": 0}
+
+    def cached(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.counters["memory"] += 1
+                return entry[1]
+            row = self.db.execute("SELECT data, expires_at FROM tmdb WHERE key = ?", (key,)).fetchone()
+            if not row or row[1] <= now: return None
+            self.remember(key, json.loads(row[0]), row[1])
+            self.counters["disk"] += 1
+            return self.entries[key][1]
+
+    def remember(self, key, data, expires_at):
+        self.entries[key] = (expires_at, data)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size: self.entries.popitem(last=False)
+
+    def store(self, key, data):
+        expires_at = time.time() + ttl_for(key)
+        with self.lock:
+            self.remember(key, data, expires_at)
+            self.db.execute("INSERT OR REPLACE INTO tmdb VALUES (?, ?, ?)", (key, json.dumps(data), expires_at))
+
+    def store_response(self, key, data):
+        # Seasons that came along through append_to_response get their own cache entries next to the base record
+        if "?append_to_response=" in key:
+            key = key.partition("?")[0]
+            for field in [field for field in data if field.startswith("season/")]:
+                self.store(f"{key}/{field}", data.pop(field))
+        self.store(key, data)
+        return data
+
+    def url(self, key):
+        path, _, query = key.partition("?")
+        return f"{TMDB_URL}/{path}?api_key={TMDB_API_KEY}" + (f"&{query}" if query else "")
+
+    def fetch(self, key):
+        data = self.cached(key)
+        if data is not None: return data
+
+        with self.lock:
+            flight = self.sync_flights.get(key)
+            leader = flight is None
+            if leader: flight = self.sync_flights[key] = {"done": threading.Event(), "data": None, "error": None}
+            else: self.counters["coalesced"] += 1
+        if not leader:
+            flight["done"].wait()
+            if flight["error"]: raise flight["error"]
+            return flight["data"]
+
+        try:
+            self.counters["fetched"] += 1
+            response = self.session.get(self.url(key))
+            response.raise_for_status()
+            flight["data"] = self.store_response(key, response.json())
+            return flight["data"]
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self.lock: self.sync_flights.pop(key, None)
+            flight["done"].set()
+
+    async def afetch(self, key, client=None):
+        data = self.cached(key)
+        if data is not None: return data
+
+        flight = self.async_flights.get(key)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(flight)
+
+        async def request():
+            self.counters["fetched"] += 1
+            response = await (client or self.client()).get(self.url(key))
+            response.raise_for_status()
+            return self.store_response(key, response.json())
+
+        flight = self.async_flights[key] = asyncio.ensure_future(request())
+        flight.add_done_callback(lambda _: self.async_flights.pop(key, None))
+        return await asyncio.shield(flight)
+
+    def client(self):
+        # The pooled AsyncClient belongs to one event loop, a new asyncio.run gets a new one
+        loop = asyncio.get_running_loop()
+        if self.async_loop is not loop:
+            self.async_client = httpx.AsyncClient(limits=httpx.Limits(max_connections=20, max_keepalive_connections=10), timeout=15)
+            self.async_loop = loop
+        return self.async_client
+
+    def get(self, type, tmdbid):
+        return self.fetch(f"{type}/{tmdbid}")
+
+    async def aget(self, type, tmdbid, client=None):
+        return await self.afetch(f"{type}/{tmdbid}", client)
+
+    def season(self, tmdbid, season):
+        return self.fetch(f"tv/{tmdbid}/season/{season}")
+
+    async def aseason(self, tmdbid, season, client=None):
+        return await self.afetch(f"tv/{tmdbid}/season/{season}", client)
+
+    async def prefetch_seasons(self, tmdbid, seasons=None, client=None):
+        # Every season's episode list through append_to_response, 20 seasons per request and the requests in parallel
+        if seasons is None: seasons = range(1, (await self.aget("tv", tmdbid, client)).get("number_of_seasons", 0) + 1)
+        missing = [season for season in seasons if self.cached(f"tv/{tmdbid}/season/{season}") is None]
+        chunks = [missing[start:start + APPEND_MAX] for start in range(0, len(missing), APPEND_MAX)]
+        await asyncio.gather(*[self.afetch(f"tv/{tmdbid}?append_to_response=" + ",".join(f"season/{season}" for season in chunk), client) for chunk in chunks])
+        return {season: self.cached(f"tv/{tmdbid}/season/{season}") for season in seasons}
+
+    def title_year(self, type, tmdbid):
+        data = self.get(type, tmdbid)
+        date = data.get("first_air_date" if type == "tv" else "release_date", "") or ""
+        return data.get("name" if type == "tv" else "title", ""), date[:4]
+
+    def stats(self):
+        return {"entries": len(self.entries), **self.counters}
+
+tmdb = TMDBClient()
+
+if __name__ == "__main__":
+    print(tmdb.title_year("tv", "40075"))
+    print(len(asyncio.run(tmdb.prefetch_seasons("40075"))), "seasons cached")
+    print(tmdb.stats())
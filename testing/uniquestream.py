@@ -1,30 +1,101 @@
-import requests
+import httpx, asyncio, time
+from collections import OrderedDict
+from id_map import id_map
 
-title = "Horimiya"
-season_num = 1
-episode_num = 1
+UNIQUESTREAM_URL = "https://anime.uniquestream.net/api/v1"
+PROVIDER = "uniquestream"
+EPISODE_PAGE_SIZE = 100 # what we ask for, if the API caps it lower the real size is learned from the first page
+PAGE_CONCURRENCY = 4
+INDEX_TTL = 60 * 60
+INDEX_SIZE = 500
+REBUILD_AFTER = 5 * 60 # an index missing the asked-for episode is rebuilt at most this often
 
-params = {"page": "1", "query": title, "t": "all"}
-r = requests.get("https://anime.uniquestream.net/api/v1/search", params=params)
+class EpisodeIndexCache:
+    # season content_id -> {episode number: episode content_id}
+    def __init__(self, ttl=INDEX_TTL, size=INDEX_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
 
-for anime in r.json()['series']:
-    if anime['title'].lower() == title.lower(): id = anime['content_id']; break
+    def get(self, season_id):
+        entry = self.entries.get(season_id)
+        if not entry or time.time() - entry[0] > self.ttl: return None
+        self.entries.move_to_end(season_id)
+        return entry[1]
 
-r = requests.get(f"https://anime.uniquestream.net/api/v1/series/{id}")
+    def age(self, season_id):
+        entry = self.entries.get(season_id)
+        return time.time() - entry[0] if entry else None
 
-for season in r.json()['seasons']:
-    if season['title'] == title and season['season_number'] == season_num: season_id = season['content_id']
+    def set(self, season_id, index):
+        self.entries[season_id] = (time.time(), index)
+        self.entries.move_to_end(season_id)
+        while len(self.entries) > self.size: self.entries.popitem(last=False)
 
-page = 1
-while True:
-    r = requests.get(f"https://anime.uniquestream.net/api/v1/season/{season_id}/episodes", params={"limit": 20, "order_by": "asc", "page": page})
-    
-    episodes = r.json()
-    if not episodes: raise Exception(f"Episode {episode_num} not found")
-        
-    for episode in episodes:
-        if int(float(episode['episode'])) == episode_num: episode_id = episode['content_id']; break
-        else: page += 1; continue
-    break
+index_cache = EpisodeIndexCache()
 
-print(episode_id)
\ No newline at end of file
+async def find_series_id(client, title):
+    response = await client.get(f"{UNIQUESTREAM_URL}/search", params={"page": "1", "query": title, "t": "all"})
+    for anime in response.json()['series']:
+        if anime['title'].lower() == title.lower(): return anime['content_id']
+    return None
+
+async def find_season_id(client, series_id, title, season_num):
+    response = await client.get(f"{UNIQUESTREAM_URL}/series/{series_id}")
+    for season in response.json()['seasons']:
+        if season['title'] == title and season['season_number'] == season_num: return season['content_id']
+    return None
+
+async def fetch_episode_page(client, season_id, page, limit=EPISODE_PAGE_SIZE):
+    response = await client.get(f"{UNIQUESTREAM_URL}/season/{season_id}/episodes", params={"limit": limit, "order_by": "asc", "page": page})
+    return response.json() or []
+
+async def build_episode_index(client, season_id, concurrency=PAGE_CONCURRENCY):
+    # Page 1 tells us how many episodes a page really holds, then the rest come in concurrent waves until a short page
+    first = await fetch_episode_page(client, season_id, 1)
+    pages = [first]
+    page_size = len(first)
+    page = 2
+    while page_size and len(pages[-1]) == page_size:
+        wave = await asyncio.gather(*[fetch_episode_page(client, season_id, number) for number in range(page, page + concurrency)])
+        for episodes in wave:
+            pages.append(episodes)
+            if len(episodes) < page_size: break
+        page += concurrency
+
+    index = {}
+    for episodes in pages:
+        for episode in episodes: index.setdefault(int(float(episode['episode'])), episode['content_id'])
+    index_cache.set(season_id, index)
+    return index
+
+async def episode_index(client, season_id, episode_num=None):
+    # A cached index that lacks the episode is rebuilt, it may have aired since
+    index = index_cache.get(season_id)
+    stale = episode_num is not None and index is not None and episode_num not in index and index_cache.age(season_id) > REBUILD_AFTER
+    if index is None or stale: index = await build_episode_index(client, season_id)
+    return index
+
+async def find_episode_id(title, season_num, episode_num, client=None, tmdb_id=None):
+    # With a tmdb_id the series and season ids come from id_map after the first lookup, skipping the search and series calls
+    if client is None:
+        async with httpx.AsyncClient(follow_redirects=True) as client: return await find_episode_id(title, season_num, episode_num, client, tmdb_id)
+
+    mapped = id_map.get(PROVIDER, "tv", tmdb_id, season_num) if tmdb_id else None
+    index = await episode_index(client, mapped["season_id"], episode_num) if mapped else None
+    if mapped and not index:
+        id_map.forget(PROVIDER, "tv", tmdb_id, season_num) # the mapped season has no episodes anymore, search again
+        mapped = None
+    if not mapped:
+        series_id = await find_series_id(client, title)
+        if series_id is None: raise Exception(f"{title} not found")
+        season_id = await find_season_id(client, series_id, title, season_num)
+        if season_id is None: raise Exception(f"Season {season_num} not found")
+        index = await episode_index(client, season_id, episode_num)
+        if tmdb_id and index: id_map.put(PROVIDER, "tv", tmdb_id, series_id, season_num, season_id)
+
+    if episode_num not in index: raise Exception(f"Episode {episode_num} not found")
+    return index[episode_num]
+
+if __name__ == "__main__":
+    print(asyncio.run(find_episode_id("Horimiya", 1, 1)))
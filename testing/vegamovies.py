@@ -2,56 +2,105 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import quote_plus
 import re
+from tmdb import tmdb
+from id_map import id_map
+
+PROVIDER = "vegamovies"
+
+QUALITY_TAGS = ['PREHD', 'PRE-HD', 'WEB-DL', 'HDTS', 'HDR', 'BDRip', 'Dual Audio', 'BluRay']
+QUALITY_PATTERN = re.compile("|".join(re.escape(tag) for tag in QUALITY_TAGS), re.IGNORECASE)
+# Every occurrence of every tag, overlapping ones included: one lookahead group per tag, and no two tags
+# can match at the same position so each position reports at most one
+QUALITY_SCAN = re.compile("(?=(?:" + "|".join(f"({re.escape(tag)})" for tag in QUALITY_TAGS) + "))", re.IGNORECASE)
+QUALITY_PATTERNS = [re.compile(re.escape(tag), re.IGNORECASE) for tag in QUALITY_TAGS]
+HINDI_COMBO_PATTERN = re.compile(r'\(Hindi\s*[-–]\s*([^)]+)\)', re.IGNORECASE)
+HINDI_PATTERN = re.compile(r'\bHindi\b', re.IGNORECASE)
+DASH_PARENS_PATTERN = re.compile(r'\(\s*[-–]\s*[^)]*\)')
+EMPTY_PARENS_PATTERN = re.compile(r'\(\s*\)')
+RESOLUTION_PATTERN = re.compile(r'(?:1080p|720p|480p)(?:\s*[-–]\s*(?:1080p|720p|480p))*', re.IGNORECASE)
+SPACES_PATTERN = re.compile(r'\s+')
+
+def strip_quality_tags(title):
+    occurrences = QUALITY_SCAN.findall(title)
+    if not occurrences: return title, []
+    cleaned_title, removed = QUALITY_PATTERN.subn('', title)
+
+    # Removing every match at once is what the old tag-by-tag passes did unless two tags share characters ("BDRIPREHD",
+    # the one-pass removal then skips an occurrence) or a removal glues its neighbours into another tag ("HDPREHDR")
+    if removed == len(occurrences) and not QUALITY_PATTERN.search(cleaned_title):
+        return cleaned_title, [tag for tag, column in zip(QUALITY_TAGS, zip(*occurrences)) if any(column)]
+
+    found_tags = []
+    cleaned_title = title
+    for tag, pattern in zip(QUALITY_TAGS, QUALITY_PATTERNS):
+        if pattern.search(cleaned_title):
+            found_tags.append(tag)
+            cleaned_title = pattern.sub('', cleaned_title)
+    return cleaned_title, found_tags
 
 def extract_quality_tags(title):
-    quality_tags = ['PREHD', 'PRE-HD', 'WEB-DL', 'HDTS', 'HDR', 'BDRip', 'Dual Audio', 'BluRay']
     found_tags = []
     cleaned_title = title
     
-    hindi_combo_pattern = re.compile(r'\(Hindi\s*[-–]\s*([^)]+)\)', re.IGNORECASE)
-    hindi_combo_match = hindi_combo_pattern.search(cleaned_title)
+    hindi_combo_match = HINDI_COMBO_PATTERN.search(cleaned_title)
     if hindi_combo_match:
         found_tags.append(f'Hindi - {hindi_combo_match.group(1).strip()}')
-        cleaned_title = hindi_combo_pattern.sub('', cleaned_title)
-    elif re.search(r'\bHindi\b', cleaned_title, re.IGNORECASE):
+        cleaned_title = HINDI_COMBO_PATTERN.sub('', cleaned_title)
+    elif HINDI_PATTERN.search(cleaned_title):
         found_tags.append('Hindi')
-        cleaned_title = re.sub(r'\bHindi\b', '', cleaned_title, flags=re.IGNORECASE)
+        cleaned_title = HINDI_PATTERN.sub('', cleaned_title)
     
-    cleaned_title = re.sub(r'\(\s*[-–]\s*[^)]*\)', '', cleaned_title)
-    cleaned_title = re.sub(r'\(\s*\)', '', cleaned_title)
+    cleaned_title = DASH_PARENS_PATTERN.sub('', cleaned_title)
+    cleaned_title = EMPTY_PARENS_PATTERN.sub('', cleaned_title)
     
-    for tag in quality_tags:
-        pattern = re.compile(re.escape(tag), re.IGNORECASE)
-        if pattern.search(cleaned_title):
-            found_tags.append(tag)
-            cleaned_title = pattern.sub('', cleaned_title)
+    cleaned_title, quality_tags = strip_quality_tags(cleaned_title)
+    found_tags += quality_tags
     
-    cleaned_title = re.sub(r'(?:1080p|720p|480p)(?:\s*[-–]\s*(?:1080p|720p|480p))*', '', cleaned_title, flags=re.IGNORECASE)
-    cleaned_title = re.sub(r'\s+', ' ', cleaned_title).strip()
+    cleaned_title = RESOLUTION_PATTERN.sub('', cleaned_title)
+    cleaned_title = SPACES_PATTERN.sub(' ', cleaned_title).strip()
     
     return cleaned_title, found_tags
 
+def extract_quality_tags_batch(titles):
+    # For catalogue ingestion: release titles repeat a lot across posts, each distinct one is parsed once
+    seen = {}
+    results = []
+    for title in titles:
+        if title not in seen: seen[title] = extract_quality_tags(title)
+        cleaned_title, found_tags = seen[title]
+        results.append((cleaned_title, list(found_tags)))
+    return results
+
 def get_vega_downloads(tmdbid):
-    tmdb_url = f"https://api.themoviedb.org/3/movie/{tmdbid}?api_key=8265bd1679663a7ea12ac168da84d2e8"
-    tmdb_response = requests.get(tmdb_url)
-    tmdb_data = tmdb_response.json()
+    # The post url from id_map when this movie was found before, the search's first post-item otherwise
+    mapped = id_map.get(PROVIDER, "movie", tmdbid)
+    if mapped:
+        r = requests.get(mapped["id"])
+        soup = BeautifulSoup(r.text, 'html.parser')
+        if not r.ok or not soup.find('h1', class_='entry-title'):
+            id_map.forget(PROVIDER, "movie", tmdbid) # the post moved, search again
+            mapped = None
 
-    query = quote_plus(f"{tmdb_data['title']} {tmdb_data['release_date'][:4]}")
-    r = requests.post("https://vegamovies.cd", headers={"content-type": "application/x-www-form-urlencoded"}, data={"do": "search", "subaction": "search", "story": query})
+    if not mapped:
+        tmdb_data = tmdb.get("movie", tmdbid)
 
-    soup = BeautifulSoup(r.text, 'html.parser')
-    post_items = soup.find_all('article', class_='post-item site__col')
-    if post_items:
-        first_post_item = post_items[0]
-        a_tag = first_post_item.find('a')
-        if a_tag:
-            href = a_tag.get('href')
-    
-    r = requests.get(href)
+        query = quote_plus(f"{tmdb_data['title']} {tmdb_data['release_date'][:4]}")
+        r = requests.post("https://vegamovies.cd", headers={"content-type": "application/x-www-form-urlencoded"}, data={"do": "search", "subaction": "search", "story": query})
+
+        soup = BeautifulSoup(r.text, 'html.parser')
+        post_items = soup.find_all('article', class_='post-item site__col')
+        if post_items:
+            first_post_item = post_items[0]
+            a_tag = first_post_item.find('a')
+            if a_tag:
+                href = a_tag.get('href')
+
+        r = requests.get(href)
+        soup = BeautifulSoup(r.text, 'html.parser')
 
-    soup = BeautifulSoup(r.text, 'html.parser')
     a_tags = soup.find_all('a', class_='btn', href=lambda href: href and 'fast-dl.lol' in href)
     title = soup.find('h1', class_='entry-title').text.strip()
+    if not mapped: id_map.put(PROVIDER, "movie", tmdbid, href)
     
     cleaned_title, quality_tags = extract_quality_tags(title)
     
@@ -76,5 +125,6 @@ def get_vega_downloads(tmdbid):
                 })
     
     return results
-    
-print(get_vega_downloads(911430))
\ No newline at end of file
+
+if __name__ == "__main__":
+    print(get_vega_downloads(911430))
\ No newline at end of file